@@ -0,0 +1,361 @@
+"""
+Benchmark suite for the minesweeper solvers
+
+Measures, on seeded random boards (or, with --consistent, boards generated
+from real mine layouts) plus the predefined states:
+-The latency of each phase of the SAT engine, as recorded by the
+ instrumentation hooks (building the initial state facts, adding the middle
+ square constraints, converting to CNF, the SAT backend and decoding the
+ model), and of the extra satisfiability check test_state used to make
+-The end to end latency, throughput and memory allocated per board for
+ every engine
+
+With --startup it also measures how long a new Python process takes to
+import state and to solve one board with the direct and sat engines (what
+every short lived CLI call or worker process pays)
+
+With --cardinality it also compares the size and solve time of the exactly-k
+constraints of the predefined states encoded with lib204.Encoding's sequential
+counter against the naive expansion over every subset of k squares
+
+Results can be saved as JSON and compared against a saved baseline so that
+regressions are visible. Run 'python src/benchmark.py --help' for options
+"""
+
+from argparse import ArgumentParser
+from itertools import combinations
+import json
+import os
+from random import Random
+from statistics import median
+import subprocess
+import sys
+from time import perf_counter
+import tracemalloc
+from typing import TYPE_CHECKING, Callable, Dict, List
+from predefined_states import state_list
+import generator
+from instrument import Profiler, summarize
+import propagation
+from state import MinesweeperState, solve_many, verdict_cache
+
+if TYPE_CHECKING:
+    from nnf import Or, Var  # Only imported when needed (see cardinality_encodings)
+
+
+def random_boards(count: int, seed: int = 204) -> List[List[List[int]]]:
+    """
+    Generates random 5x5 boards with an unknown middle square. Each board has
+    its own density of covered squares (mines or unknowns), so every solution
+    shows up regularly
+
+    @param count: number of boards
+    @param seed: seed of the random number generator
+    @return a list of 5x5 minesweeper states
+    """
+    rng = Random(seed)
+    boards = []
+    for _ in range(count):
+        density = rng.random()
+        board = [[rng.choice([-2, -1]) if rng.random() < density else rng.randint(0, 8)
+                  for _ in range(5)] for _ in range(5)]
+        board[2][2] = -1
+        boards.append(board)
+    return boards
+
+
+def benchmark_boards(count: int, seed: int = 204, consistent: bool = False) -> List[List[List[int]]]:
+    """
+    Returns the predefined states followed by seeded random boards
+
+    @param count: number of random boards
+    @param seed: seed of the random number generator
+    @param consistent: True to generate boards that match a real mine layout
+                       (see generator.windows) instead of random boards
+    @return a list of 5x5 minesweeper states
+    """
+    if consistent:
+        boards = list(generator.windows(count, seed, packed=False))
+    else:
+        boards = random_boards(count, seed)
+    return [state_list[n]['state'] for n in state_list] + boards
+
+
+def sat_phases(boards: List[List[List[int]]]) -> Dict[str, Dict[str, float]]:
+    """
+    Measures the latency of each phase of the SAT engine for every board, as
+    recorded by an instrument.Profiler (see instrument.py for the phases),
+    and of the extra satisfiability check test_state used to make (on an
+    emptied cache, so it converts the encoding to CNF and calls the SAT
+    solver again like it did)
+
+    @param boards: a list of 5x5 minesweeper states
+    @return a dictionary from each phase to its latency summary
+    """
+    records = []
+    phases = {}
+    for board in boards:
+        state = MinesweeperState(board)
+        with Profiler(records.append):
+            state.solve()
+        for phase, microseconds in records.pop()['phases'].items():
+            phases.setdefault(phase, []).append(microseconds / 1e6)
+        state.E.cache.clear()  # Check again instead of reusing the result of solve
+        start = perf_counter()
+        state.E.is_satisfiable()
+        phases.setdefault('is_satisfiable', []).append(perf_counter() - start)
+    return {phase: summarize(samples) for phase, samples in phases.items()}
+
+
+def engines() -> Dict[str, Callable[[List[List[int]]], str]]:
+    """
+    Returns a function solving one board for every engine that can be measured
+
+    @return a dictionary from the engine name to its function
+    """
+    verdict_cache.clear()  # The cached engine starts cold
+    solvers = {'sat': lambda board: MinesweeperState(board).solve(),
+               'direct': lambda board: solve_many([board], 'direct')[0],
+               'cached': lambda board: solve_many([board], 'cached')[0],
+               'template': lambda board: solve_many([board], 'template')[0],
+               'table': lambda board: solve_many([board], 'table')[0],
+               'propagation': lambda board: solve_many([board], 'propagation')[0]}
+    try:
+        import vectorized  # pylint: disable=import-outside-toplevel
+        solvers['vectorized'] = lambda board: vectorized.solve_batch([board])[0]
+    except ImportError:
+        pass  # numpy is not installed
+    return solvers
+
+
+def naive_exactly(variables: List['Var'], k: int) -> 'Or':
+    """
+    Returns the constraint that exactly k of the variables are True, as a
+    disjunction over every subset of k variables
+
+    @param variables: the variables
+    @param k: the number of True variables
+    @return the constraint
+    """
+    from nnf import And, Or  # pylint: disable=import-outside-toplevel
+    return Or([And([var if n in chosen else ~var for n, var in enumerate(variables)])
+               for chosen in map(set, combinations(range(len(variables)), k))])
+
+
+def cardinality_encodings(repeat: int = 5) -> Dict[str, Dict[str, dict]]:
+    """
+    Encodes the exactly-k constraint of every revealed square in the inner 3x3
+    grid of each predefined state (see propagation.get_constraints) naively and
+    with Encoding.add_exactly, and measures the size of each encoding and the
+    time to check that the middle square can be a mine
+
+    @param repeat: number of times each encoding is solved
+    @return a dictionary from each state number to the size, number of
+            variables and median solve time (microseconds) of each encoding
+    """
+    # Imported here so nnf is only loaded when the encodings are compared
+    from lib204 import Encoding  # pylint: disable=import-outside-toplevel
+    from nnf import Var  # pylint: disable=import-outside-toplevel
+
+    results = {}
+    for n in state_list:
+        constraints = propagation.get_constraints(state_list[n]['state'])
+        if constraints is None:
+            continue  # A single square is already impossible
+        mine = {(i, j): Var(f"m{i}{j}") for i in range(5) for j in range(5)}
+        encodings = {'naive': Encoding(), 'counter': Encoding()}
+        for squares, mines in sorted(constraints, key=lambda constraint: sorted(constraint[0])):
+            variables = [mine[square] for square in sorted(squares)]
+            encodings['naive'].add_constraint(naive_exactly(variables, mines))
+            encodings['counter'].add_exactly(variables, mines)
+        results[str(n)] = {}
+        for name, E in encodings.items():
+            E.add_constraint(mine[propagation.MIDDLE])
+            samples = []
+            for _ in range(repeat):
+                E.cache.clear()  # Solve again instead of reusing the cached result
+                start = perf_counter()
+                satisfiable = E.is_satisfiable()
+                samples.append(perf_counter() - start)
+            results[str(n)][name] = {'size': E.size(), 'vars': len(E.vars()),
+                                     'solve_us': summarize(samples)['p50_us'],
+                                     'satisfiable': satisfiable}
+    return results
+
+
+def startup_times(repeat: int = 5) -> Dict[str, float]:
+    """
+    Measures the wall time of new Python processes that import state or solve
+    one board
+
+    @param repeat: number of processes started for each command
+    @return a dictionary from each command to its median time in
+            milliseconds ('ms')
+    """
+    board = state_list[1]['state']
+    commands = {'python': "pass", 'import state': "import state"}
+    for engine in ['direct', 'sat']:
+        commands[f'solve {engine}'] = f"from state import solve_many; solve_many([{board}], '{engine}')"
+
+    src = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    for name, command in commands.items():
+        samples = []
+        for _ in range(repeat):
+            start = perf_counter()
+            # Run from the repository root, like the CLI, so bin/ is found
+            subprocess.run([sys.executable, '-c', f"import sys; sys.path.insert(0, {src!r}); {command}"],
+                           check=True, cwd=os.path.dirname(src))
+            samples.append(perf_counter() - start)
+        results[name] = {'ms': median(samples) * 1e3}
+    return results
+
+
+def measure_engine(solver, boards: List[List[List[int]]], repeat: int = 1) -> dict:
+    """
+    Measures the per board latency, throughput and memory allocations of an
+    engine
+
+    @param solver: function solving one board
+    @param boards: a list of 5x5 minesweeper states
+    @param repeat: number of passes over the boards (later passes show the
+                   steady state of engines with a cache)
+    @return a dictionary with the latency summary, throughput (boards/s) and
+            the average number of bytes allocated per board
+    """
+    samples = []
+    start_all = perf_counter()
+    for _ in range(repeat):
+        for board in boards:
+            start = perf_counter()
+            solver(board)
+            samples.append(perf_counter() - start)
+    elapsed = perf_counter() - start_all
+
+    # Allocations are measured separately since tracing slows down solving
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sample = boards[:min(len(boards), 100)]
+    for board in sample:
+        solver(board)
+    allocated, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = summarize(samples)
+    result['boards_per_s'] = len(samples) / elapsed
+    result['retained_bytes_per_board'] = max(0, allocated - before) / len(sample)
+    result['peak_bytes'] = peak
+    return result
+
+
+def run(count: int, seed: int, repeat: int, selected: List[str] = None,
+        cardinality: bool = False, startup: bool = False, consistent: bool = False) -> dict:
+    """
+    Runs every benchmark
+
+    @param count: number of random boards
+    @param seed: seed of the random number generator
+    @param repeat: number of passes over the boards for the fast engines
+    @param selected: names of the engines to measure (all of them if None)
+    @param cardinality: True to also compare the cardinality encodings
+    @param startup: True to also measure the startup time of new processes
+    @param consistent: True to measure consistent boards (see benchmark_boards)
+    @return a dictionary with the SAT phase latencies and engine measurements
+    """
+    boards = benchmark_boards(count, seed, consistent)
+    results = {'boards': len(boards), 'seed': seed, 'consistent': consistent, 'engines': {}}
+    solvers = engines()
+    if selected is None or 'sat' in selected:
+        results['sat_phases'] = sat_phases(boards)
+    for name, solver in solvers.items():
+        if selected is None or name in selected:
+            # The SAT engine is thousands of times slower, one pass is enough
+            passes = 1 if name == 'sat' else repeat
+            results['engines'][name] = measure_engine(solver, boards, passes)
+    if cardinality:
+        results['cardinality'] = cardinality_encodings(repeat)
+    if startup:
+        results['startup'] = startup_times(repeat)
+    return results
+
+
+def print_results(results: dict, baseline: dict = None):
+    """
+    Prints benchmark results as tables, with the change from a baseline
+
+    @param results: results from run
+    @param baseline: results from a previous run to compare against
+    """
+    def change(section, name, key, value):
+        try:
+            old = baseline[section][name][key]
+        except (KeyError, TypeError):
+            return ''
+        return f" ({(value - old) / old * 100:+.1f}%)" if old else ''
+
+    kind = 'consistent' if results.get('consistent') else 'random'
+    print(f"\n{results['boards']} boards ({kind}, seed {results['seed']})")
+    if 'sat_phases' in results:
+        print("\nSAT engine phases (microseconds)")
+        print(f"{'phase':<16} {'mean':>10} {'p50':>10} {'p90':>10} {'p99':>10}")
+        for phase, stats in results['sat_phases'].items():
+            print(f"{phase:<16} {stats['mean_us']:>10.1f} {stats['p50_us']:>10.1f} "
+                  f"{stats['p90_us']:>10.1f} {stats['p99_us']:>10.1f}"
+                  + change('sat_phases', phase, 'p50_us', stats['p50_us']))
+
+    print("\nEngines")
+    print(f"{'engine':<12} {'boards/s':>12} {'p50 us':>10} {'p99 us':>10} {'bytes/board':>12}")
+    for name, stats in results['engines'].items():
+        print(f"{name:<12} {stats['boards_per_s']:>12.1f} {stats['p50_us']:>10.1f} "
+              f"{stats['p99_us']:>10.1f} {stats['retained_bytes_per_board']:>12.1f}"
+              + change('engines', name, 'boards_per_s', stats['boards_per_s']))
+
+    if 'startup' in results:
+        print("\nStartup of a new process (milliseconds)")
+        for name, stats in results['startup'].items():
+            print(f"{name:<16} {stats['ms']:>10.1f}" + change('startup', name, 'ms', stats['ms']))
+
+    if 'cardinality' in results:
+        print("\nExactly-k encodings of the predefined states (naive / sequential counter)")
+        print(f"{'state':<6} {'size':>13} {'vars':>11} {'solve us':>19}")
+        for n, encodings in results['cardinality'].items():
+            naive, counter = encodings['naive'], encodings['counter']
+            print(f"{n:<6} {naive['size']:>6} / {counter['size']:<4} "
+                  f"{naive['vars']:>4} / {counter['vars']:<4} "
+                  f"{naive['solve_us']:>8.0f} / {counter['solve_us']:<8.0f}")
+
+
+def main():
+    """
+    Runs the benchmarks from the command line
+    """
+    parser = ArgumentParser(description="Benchmark the minesweeper solvers")
+    parser.add_argument('--boards', type=int, default=500, help="number of random boards")
+    parser.add_argument('--seed', type=int, default=204)
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="passes over the boards for the fast engines")
+    parser.add_argument('--engines', nargs='+', help="engines to measure (default: all)")
+    parser.add_argument('--cardinality', action='store_true',
+                        help="compare the exactly-k encodings of the predefined states")
+    parser.add_argument('--consistent', action='store_true',
+                        help="use boards that match a real mine layout instead of random boards")
+    parser.add_argument('--startup', action='store_true',
+                        help="measure the startup time of new processes")
+    parser.add_argument('--save', help="write the results to this JSON file")
+    parser.add_argument('--baseline', help="compare against results saved with --save")
+    args = parser.parse_args()
+
+    results = run(args.boards, args.seed, args.repeat, args.engines, args.cardinality,
+                  args.startup, args.consistent)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)
+    print_results(results, baseline)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""
+Board solver for minesweeper states of any size
+
+Applies the same x and y conditions as MinesweeperState to every unknown
+square of an N x M board in one pass. The conditions of each revealed square
+are computed once and shared by all of the unknown squares around it, instead
+of building a separate 5x5 state for every unknown square
+"""
+
+from typing import Dict, List, Optional, Tuple
+from direct import ADJACENT, verdict
+
+Square = Tuple[int, int]
+
+
+def variable_name(prefix: str, i: int, j: int) -> str:
+    """
+    Returns the name of a condition variable for a square. The row and column
+    are separated so names stay unique past single digit coordinates
+
+    @param prefix: the condition (x, y, m, u or s)
+    @param i: row number of the square
+    @param j: column number of the square
+    @return the variable name, for example 'm12_3' for the square at (12, 3)
+    """
+    return f"{prefix}{i}_{j}"
+
+
+def check_board(grid: List[List[int]]):
+    """
+    Raises an exception if a board is not rectangular or a square has an
+    illegal value
+
+    @param grid: a minesweeper state of any size
+    """
+    if not grid or not all(len(row) == len(grid[0]) for row in grid):
+        raise Exception("error: the board must have rows of the same length")
+    for i, row in enumerate(grid):
+        for j, square in enumerate(row):
+            if not isinstance(square, int) or not -2 <= square <= 8:
+                raise Exception('error: each square of the grid must'
+                                'have a value between -2 and 8'
+                                f'inclusive. Square [{i}][{j}] has a'
+                                f'value of {square}')
+
+
+def adjacent_squares(grid: List[List[int]], i: int, j: int) -> List[Square]:
+    """
+    Returns the coordinates of the squares adjacent to a square (squares on
+    the edge of the board have fewer than 8)
+
+    @param grid: a minesweeper state of any size
+    @param i: row number of the square
+    @param j: column number of the square
+    @return a list of (row, column) tuples
+    """
+    rows, cols = len(grid), len(grid[0])
+    return [(i + di, j + dj) for di, dj in ADJACENT
+            if 0 <= i + di < rows and 0 <= j + dj < cols]
+
+
+def square_conditions(grid: List[List[int]], i: int, j: int) -> Optional[Tuple[bool, bool]]:
+    """
+    Computes the x and y conditions of one square
+
+    @param grid: a minesweeper state of any size
+    @param i: row number of the square
+    @param j: column number of the square
+    @return a tuple of the square's x and y conditions, or None if it is not
+            revealed or not next to an unknown square (its conditions cannot
+            decide anything)
+    """
+    square = grid[i][j]
+    if square < 0:
+        return None
+    adjacent = [grid[a][b] for a, b in adjacent_squares(grid, i, j)]
+    if -1 not in adjacent:
+        return None
+    mines = adjacent.count(-2)
+    return square == mines, square == mines + adjacent.count(-1)
+
+
+def get_conditions(grid: List[List[int]]) -> Dict[Square, Tuple[bool, bool]]:
+    """
+    Computes the x and y conditions of every revealed square that is next to
+    at least one unknown square
+
+    @param grid: a minesweeper state of any size
+    @return a dictionary from the (row, column) of each of these squares to a
+            tuple of its x and y conditions
+    """
+    conditions = {}
+    for i, row in enumerate(grid):
+        for j in range(len(row)):
+            square = square_conditions(grid, i, j)
+            if square is not None:
+                conditions[(i, j)] = square
+    return conditions
+
+
+def solve_board(grid: List[List[int]], engine: str = 'direct') -> Dict[Square, str]:
+    """
+    Solves every unknown square of a board. An unknown square is a mine if an
+    adjacent square is a y and is safe if an adjacent square is an x (see
+    MinesweeperState for the boolean condition guide)
+
+    @param grid: a minesweeper state of any size
+    @param engine: 'direct' to evaluate the conditions directly or 'sat' to
+                   solve one encoding for the whole board
+    @return a dictionary from the (row, column) of each unknown square to its
+            solution (see MinesweeperState.get_solution)
+    """
+    check_board(grid)
+    if engine not in ['direct', 'sat']:
+        raise Exception("error: engine must be one of direct, sat")
+
+    conditions = get_conditions(grid)
+    unknowns = [(i, j) for i, row in enumerate(grid)
+                for j, square in enumerate(row) if square == -1]
+    if engine == 'sat':
+        return _solve_encoding(grid, conditions, unknowns)
+
+    solutions = {}
+    for i, j in unknowns:
+        mine = safe = False
+        for square in adjacent_squares(grid, i, j):
+            if square in conditions:
+                x, y = conditions[square]
+                safe = safe or x
+                mine = mine or y
+        solutions[(i, j)] = verdict(mine, safe)
+    return solutions
+
+
+def _solve_encoding(grid, conditions, unknowns) -> Dict[Square, str]:
+    """
+    Builds a single encoding for every unknown square of a board and solves it
+
+    @param grid: a minesweeper state of any size
+    @param conditions: the x and y conditions from get_conditions
+    @param unknowns: coordinates of the unknown squares
+    @return a dictionary from each unknown square to its solution
+    """
+    # Imported here so nnf is only loaded for the sat engine
+    from lib204 import Encoding  # pylint: disable=import-outside-toplevel
+    from nnf import Or, Var  # pylint: disable=import-outside-toplevel
+    from nnf.operators import iff  # pylint: disable=import-outside-toplevel
+
+    E = Encoding()
+    for (i, j), (x, y) in conditions.items():
+        x_var, y_var = Var(variable_name('x', i, j)), Var(variable_name('y', i, j))
+        E.add_constraint(x_var if x else ~x_var)
+        E.add_constraint(y_var if y else ~y_var)
+
+    for i, j in unknowns:
+        adjacent = [square for square in adjacent_squares(grid, i, j)
+                    if square in conditions]
+        m, s, u = (Var(variable_name(prefix, i, j)) for prefix in 'msu')
+        E.add_constraint(iff(Or(Var(variable_name('y', a, b)) for a, b in adjacent), m))
+        E.add_constraint(iff(Or(Var(variable_name('x', a, b)) for a, b in adjacent), s))
+        E.add_constraint(iff(~m & ~s, u))
+
+    solution = E.solve() if E.constraints else {}
+    if solution is None:
+        raise Exception("error: model is not satisfiable")
+    return {(i, j): verdict(solution.get(variable_name('m', i, j), False),
+                            solution.get(variable_name('s', i, j), False))
+            for i, j in unknowns}
@@ -0,0 +1,168 @@
+"""
+Verdict cache for 5x5 minesweeper states
+
+Boards are packed into a single integer (4 bits per square) and reduced to a
+canonical key under the 8 symmetries of the square. Rotating or reflecting a
+board maps the inner ring onto itself and keeps every square's neighbours, so
+the x and y conditions (and the solution) are the same for all 8 versions of
+a board. Solutions are memoized with a bounded least recently used policy
+"""
+
+from collections import OrderedDict
+from operator import itemgetter
+from typing import Callable, List
+import direct
+import instrument
+from packed import PackedState
+
+
+def _symmetries():
+    """
+    Returns the 8 symmetries of the square as permutations of the 25 square
+    indices (row * 5 + column) of a 5x5 board
+
+    @return a list of 8 tuples, each mapping a position in the transformed
+            board to a position in the original board
+    """
+    transforms = [lambda i, j: (i, j), lambda i, j: (j, 4 - i),
+                  lambda i, j: (4 - i, 4 - j), lambda i, j: (4 - j, i),
+                  lambda i, j: (i, 4 - j), lambda i, j: (4 - i, j),
+                  lambda i, j: (j, i), lambda i, j: (4 - j, 4 - i)]
+    permutations = []
+    for transform in transforms:
+        permutation = [0] * 25
+        for i in range(5):
+            for j in range(5):
+                new_i, new_j = transform(i, j)
+                permutation[new_i * 5 + new_j] = i * 5 + j
+        permutations.append(tuple(permutation))
+    return permutations
+
+
+SYMMETRIES = _symmetries()
+
+
+# Hexadecimal digit (value + 2) used to pack each possible square value
+_DIGITS = {value: '0123456789a'[value + 2] for value in range(-2, 9)}
+
+# Functions that reorder the 25 digits of a packed board for each symmetry
+_SYMMETRY_GETTERS = [itemgetter(*permutation) for permutation in SYMMETRIES]
+
+
+def _digits(state: List[List[int]]) -> str:
+    """
+    Returns the hexadecimal digit (value + 2) of each square of a board in row
+    order, raising an exception if a square cannot be packed
+
+    @param state: a 5x5 minesweeper state
+    @return a string of 25 hexadecimal digits
+    """
+    if isinstance(state, PackedState):
+        return f"{state.key:025x}"  # Already packed in the same layout
+    try:
+        digits = ''.join([_DIGITS[square] for row in state for square in row])
+    except (KeyError, TypeError):
+        digits = ''
+    if len(digits) != 25:
+        raise Exception("error: only 5x5 states with values in the range "
+                        "[-2, 8] can be packed")
+    return digits
+
+
+def pack(state: List[List[int]]) -> int:
+    """
+    Packs a 5x5 board into an integer with 4 bits per square; the top left
+    square is stored in the most significant bits
+
+    @param state: a 5x5 minesweeper state
+    @return the packed board
+    """
+    return int(_digits(state), 16)
+
+
+def unpack(key: int) -> List[List[int]]:
+    """
+    Unpacks an integer created by pack into a 5x5 board
+
+    @param key: a packed board
+    @return the 5x5 minesweeper state
+    """
+    squares = [((key >> (4 * (24 - n))) & 0xF) - 2 for n in range(25)]
+    return [squares[i * 5:i * 5 + 5] for i in range(5)]
+
+
+def canonical_key(state: List[List[int]]) -> int:
+    """
+    Returns the smallest packed version of a board over its 8 symmetries.
+    Boards that are rotations or reflections of each other have the same key
+
+    @param state: a 5x5 minesweeper state
+    @return the canonical packed board
+    """
+    digits = _digits(state)
+    # All versions have 25 digits, so the smallest string is the smallest key
+    return int(min(''.join(getter(digits)) for getter in _SYMMETRY_GETTERS), 16)
+
+
+class VerdictCache:
+    """
+    Memoizes the solution of boards by their canonical key, evicting the least
+    recently used entry once the cache is full
+    """
+
+    def __init__(self, maxsize: int = 65536,
+                 solver: Callable[[List[List[int]]], str] = direct.classify):
+        """
+        @param maxsize: maximum number of stored solutions
+        @param solver: function used to solve boards that are not cached
+        """
+        if not isinstance(maxsize, int) or maxsize < 1:
+            raise Exception("error: cache size must be a positive integer")
+        self.maxsize = maxsize
+        self.solver = solver
+        self.entries = OrderedDict()  # Canonical key -> solution
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, state: List[List[int]]) -> str:
+        """
+        Returns the solution of a board, solving and storing it if it is not
+        cached
+
+        @param state: a 5x5 minesweeper state
+        @return the english representation of the solution
+        """
+        key = canonical_key(state)
+        result = self.entries.get(key)
+        if result is not None:
+            self.hits += 1
+            instrument.count('cache_hits')
+            self.entries.move_to_end(key)
+            return result
+
+        self.misses += 1
+        result = self.solver(state)
+        self.entries[key] = result
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return result
+
+    def clear(self):
+        """
+        Removes every stored solution and resets the counters
+        """
+        self.entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def info(self) -> dict:
+        """
+        Returns the cache counters
+
+        @return a dictionary with the hits, misses, evictions, current size
+                and maximum size of the cache
+        """
+        return {'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'size': len(self.entries),
+                'maxsize': self.maxsize}
@@ -0,0 +1,126 @@
+"""
+Direct evaluator for 5x5 minesweeper states
+
+Every constraint in a MinesweeperState encoding is either a unit fact or is
+fully determined by counting the mines and unknown squares adjacent to the
+inner ring of 8 squares. This evaluator computes the same x and y conditions
+directly, so the solution for the middle square can be found without building
+an encoding or calling a SAT solver
+"""
+
+from typing import Dict, List, Tuple
+from packed import PackedState
+
+# Offsets of the 8 squares adjacent to a square (includes diagonals)
+ADJACENT = ((-1, -1), (-1, 0), (-1, 1),
+            (0, -1), (0, 1),
+            (1, -1), (1, 0), (1, 1))
+
+# Coordinates of the inner ring of 8 squares around the middle square
+INNER_RING = ((1, 1), (1, 2), (1, 3),
+              (2, 1), (2, 3),
+              (3, 1), (3, 2), (3, 3))
+
+
+def verdict(mine: bool, safe: bool) -> str:
+    """
+    Returns the english representation of a middle square's mine and safe
+    conditions (the same strings as MinesweeperState.get_solution)
+
+    @param mine: value of the m condition of the middle square
+    @param safe: value of the s condition of the middle square
+    @return "schrodinger's mine", 'mine', 'safe' or 'unknown'
+    """
+    if mine and safe:
+        return "schrodinger's mine"
+    if mine:
+        return "mine"
+    if safe:
+        return "safe"
+    return "unknown"
+
+
+def check_state(state: List[List[int]]):
+    """
+    Raises an exception if a square other than the middle one has an illegal
+    value (the same check done when a MinesweeperState builds its encoding)
+
+    @param state: a 5x5 minesweeper state
+    """
+    for i in range(5):
+        for j in range(5):
+            square = state[i][j]
+            if not (i == 2 and j == 2) and not -2 <= square <= 8:
+                raise Exception('error: each square of the grid must'
+                                'have a value between -2 and 8'
+                                f'inclusive. Square [{i}][{j}] has a'
+                                f'value of {square}')
+
+
+def get_conditions(state: List[List[int]], i: int, j: int) -> Tuple[bool, bool]:
+    """
+    Returns the x and y conditions of a square in the inner 3x3 grid
+
+    @param state: a 5x5 minesweeper state
+    @param i: row number of the square
+    @param j: column number of the square
+    @return a tuple with the x condition and the y condition of the square
+    """
+    mines = 0  # Number of adjacent mines
+    covered = 0  # Number of adjacent mines or unknown squares
+    for di, dj in ADJACENT:
+        adjacent_square = state[i + di][j + dj]
+        if adjacent_square == -2:
+            mines += 1
+            covered += 1
+        elif adjacent_square == -1:
+            covered += 1
+    square = state[i][j]
+    return square == mines, square == covered
+
+
+def classify(state: List[List[int]]) -> str:
+    """
+    Solves the middle square of a 5x5 minesweeper state
+
+    @param state: a 5x5 minesweeper state
+    @return the same result as MinesweeperState.get_solution for this state
+    """
+    if isinstance(state, PackedState):
+        state = state.to_list()  # Faster than unpacking a row for each square
+    check_state(state)
+    mine = safe = False
+    for i, j in INNER_RING:
+        x, y = get_conditions(state, i, j)
+        safe = safe or x
+        mine = mine or y
+    return verdict(mine, safe)
+
+
+def evaluate(state: List[List[int]]) -> Dict[str, bool]:
+    """
+    Evaluates a 5x5 minesweeper state into a model with the same variable
+    names as the SAT encoding, restricted to the inner 3x3 grid (the values
+    printed by MinesweeperState.test_state)
+
+    @param state: a 5x5 minesweeper state
+    @return a dictionary with the value of each variable
+    """
+    if isinstance(state, PackedState):
+        state = state.to_list()
+    check_state(state)
+    model = {}
+    for i, j in INNER_RING:
+        num = str(i) + str(j)
+        model['x' + num], model['y' + num] = get_conditions(state, i, j)
+        model['m' + num] = state[i][j] == -2
+        model['u' + num] = state[i][j] == -1
+        model['s' + num] = state[i][j] > -1
+
+    # The middle square's x and y conditions are computed like every other
+    # square in the inner 3x3 grid, but they are never part of a solution
+    model['x22'], model['y22'] = get_conditions(state, 2, 2)
+    model['m22'] = any(model['y' + str(i) + str(j)] for i, j in INNER_RING)
+    model['s22'] = any(model['x' + str(i) + str(j)] for i, j in INNER_RING)
+    model['u22'] = not model['m22'] and not model['s22']
+    return model
@@ -0,0 +1,268 @@
+"""
+Full game of minesweeper and an automatic player
+
+Game is a seeded minesweeper game (mines are placed on the first reveal,
+away from the revealed square). Player plays a game with the same x and y
+conditions as the board solver (see board.py): after every move it only
+re-evaluates the squares around the squares that changed, and when no square
+is known to be safe or a mine it uses the exact mine probabilities (see
+probability.py) and reveals the least likely square
+
+Run 'python src/game.py --help' to benchmark the player
+"""
+
+from argparse import ArgumentParser
+from random import Random
+from time import perf_counter
+from typing import Dict, List, Set, Tuple
+from board import adjacent_squares, square_conditions
+import probability
+
+Square = Tuple[int, int]
+
+# Standard difficulties: (rows, columns, mines)
+DIFFICULTIES = {'beginner': (9, 9, 10), 'intermediate': (16, 16, 40), 'expert': (16, 30, 99)}
+
+
+class Game:
+    """
+    A game of minesweeper. The player's view uses the same values as a state:
+    -1 for unknown squares, -2 for flagged squares and 0 to 8 for revealed
+    squares
+    """
+
+    def __init__(self, rows: int, cols: int, mines: int, seed: int = None):
+        """
+        @param rows: number of rows
+        @param cols: number of columns
+        @param mines: number of mines
+        @param seed: seed of the mine placement
+        """
+        if not rows > 0 < cols or not 0 < mines < rows * cols:
+            raise Exception("error: a game needs a positive size and between 1 "
+                            "and rows * columns - 1 mines")
+        self.rows, self.cols, self.mines = rows, cols, mines
+        self.rng = Random(seed)
+        self.mine_squares = None  # Placed on the first reveal
+        self.view = [[-1] * cols for _ in range(rows)]
+        self.revealed = 0
+        self.status = 'playing'  # 'playing', 'won' or 'lost'
+
+    def __place_mines(self, first: Square):
+        """
+        Places the mines away from the first revealed square (and its
+        neighbours, if the board is big enough)
+
+        @param first: the first revealed square
+        """
+        excluded = {first} | set(adjacent_squares(self.view, *first))
+        if self.rows * self.cols - len(excluded) < self.mines:
+            excluded = {first}
+        candidates = [(i, j) for i in range(self.rows) for j in range(self.cols)
+                      if (i, j) not in excluded]
+        self.mine_squares = set(self.rng.sample(candidates, self.mines))
+
+    def count(self, i: int, j: int) -> int:
+        """
+        Returns the number of mines adjacent to a square
+
+        @param i: row number of the square
+        @param j: column number of the square
+        @return the number of adjacent mines
+        """
+        return sum(square in self.mine_squares for square in adjacent_squares(self.view, i, j))
+
+    def reveal(self, i: int, j: int) -> List[Square]:
+        """
+        Reveals a square. Revealing a 0 also reveals its neighbours (flood fill)
+
+        @param i: row number of the square
+        @param j: column number of the square
+        @return the squares that were revealed
+        """
+        if self.status != 'playing' or self.view[i][j] != -1:
+            return []
+        if self.mine_squares is None:
+            self.__place_mines((i, j))
+        if (i, j) in self.mine_squares:
+            self.status = 'lost'
+            return []
+
+        revealed = []
+        stack = [(i, j)]
+        while stack:
+            a, b = stack.pop()
+            if self.view[a][b] != -1:
+                continue
+            self.view[a][b] = self.count(a, b)
+            revealed.append((a, b))
+            if self.view[a][b] == 0:
+                stack += [square for square in adjacent_squares(self.view, a, b)
+                          if self.view[square[0]][square[1]] == -1]
+
+        self.revealed += len(revealed)
+        if self.revealed == self.rows * self.cols - self.mines:
+            self.status = 'won'
+        return revealed
+
+    def flag(self, i: int, j: int):
+        """
+        Flags an unknown square as a mine (or removes the flag)
+
+        @param i: row number of the square
+        @param j: column number of the square
+        """
+        if self.view[i][j] == -1:
+            self.view[i][j] = -2
+        elif self.view[i][j] == -2:
+            self.view[i][j] = -1
+
+
+class Player:
+    """
+    Plays a game using the board solver conditions, updated incrementally
+    """
+
+    def __init__(self, game: Game):
+        """
+        @param game: the game to play
+        """
+        self.game = game
+        self.view = game.view
+        self.conditions: Dict[Square, Tuple[bool, bool]] = {}  # See board.square_conditions
+        self.safe: Set[Square] = set()
+        self.mines: Set[Square] = set()
+        self.guesses = 0
+        self.evaluations = 0  # Number of unknown squares re-evaluated
+
+    def __update(self, changed: List[Square]):
+        """
+        Recomputes the conditions of the revealed squares next to the changed
+        squares and re-evaluates the unknown squares around them
+
+        @param changed: squares that were revealed or flagged
+        """
+        touched = set(changed)
+        for square in changed:
+            touched.update(adjacent_squares(self.view, *square))
+
+        unknowns = set()
+        for i, j in touched:
+            conditions = square_conditions(self.view, i, j)
+            if conditions is None:
+                self.conditions.pop((i, j), None)
+                continue
+            self.conditions[(i, j)] = conditions
+            unknowns.update((a, b) for a, b in adjacent_squares(self.view, i, j)
+                            if self.view[a][b] == -1)
+
+        for i, j in unknowns:
+            self.evaluations += 1
+            for square in adjacent_squares(self.view, i, j):
+                x, y = self.conditions.get(square, (False, False))
+                if x:
+                    self.safe.add((i, j))
+                elif y:
+                    self.mines.add((i, j))
+
+    def __guess(self) -> List[Square]:
+        """
+        Uses the exact mine probabilities to find safe squares and mines the
+        conditions missed; if there are none, reveals the least likely mine
+
+        @return the squares that changed
+        """
+        game = self.game
+        probabilities = probability.mine_probabilities(self.view)
+        constrained = {square for squares, _ in probability.get_constraints(self.view)
+                       for square in squares}
+        unknown_count = len(probabilities)
+        flagged = sum(row.count(-2) for row in self.view)
+        # Unconstrained squares get the density of the remaining mines instead
+        density = max(0.0, (game.mines - flagged) / unknown_count) if unknown_count else 0.0
+
+        changed = []
+        for square, chance in probabilities.items():
+            if square not in constrained:
+                continue
+            if chance == 0:
+                self.safe.add(square)
+            elif chance == 1:
+                game.flag(*square)
+                changed.append(square)
+        if self.safe or changed:
+            return changed
+
+        self.guesses += 1
+        best = min(probabilities, key=lambda square: (
+            probabilities[square] if square in constrained else density, square))
+        return game.reveal(*best)
+
+    def play(self) -> str:
+        """
+        Plays the game until it is won or lost
+
+        @return the final status of the game ('won' or 'lost')
+        """
+        game = self.game
+        changed = game.reveal(game.rows // 2, game.cols // 2)
+        while game.status == 'playing':
+            self.__update(changed)
+            changed = []
+            for i, j in self.mines:
+                if self.view[i][j] == -1:
+                    game.flag(i, j)
+                    changed.append((i, j))
+            self.mines.clear()
+            while self.safe and game.status == 'playing':
+                i, j = self.safe.pop()
+                changed += game.reveal(i, j)
+            if not changed and game.status == 'playing':
+                changed = self.__guess()
+        return game.status
+
+
+def benchmark(games: int, seed: int, difficulties: List[str]) -> Dict[str, dict]:
+    """
+    Plays seeded games at each difficulty
+
+    @param games: number of games per difficulty
+    @param seed: seed of the first game (game n uses seed + n)
+    @param difficulties: names from DIFFICULTIES
+    @return a dictionary from each difficulty to its games/s, win rate and
+            average number of guesses per game
+    """
+    results = {}
+    for name in difficulties:
+        rows, cols, mines = DIFFICULTIES[name]
+        wins = guesses = 0
+        start = perf_counter()
+        for n in range(games):
+            player = Player(Game(rows, cols, mines, seed + n))
+            wins += player.play() == 'won'
+            guesses += player.guesses
+        elapsed = perf_counter() - start
+        results[name] = {'games_per_s': games / elapsed, 'win_rate': wins / games,
+                         'guesses_per_game': guesses / games}
+    return results
+
+
+def main():
+    """
+    Benchmarks the player from the command line
+    """
+    parser = ArgumentParser(description="Benchmark the automatic player")
+    parser.add_argument('--games', type=int, default=100, help="games per difficulty")
+    parser.add_argument('--seed', type=int, default=204)
+    parser.add_argument('--difficulties', nargs='+', default=list(DIFFICULTIES),
+                        choices=list(DIFFICULTIES))
+    args = parser.parse_args()
+
+    print(f"{'difficulty':<14} {'games/s':>10} {'win rate':>9} {'guesses':>8}")
+    for name, stats in benchmark(args.games, args.seed, args.difficulties).items():
+        print(f"{name:<14} {stats['games_per_s']:>10.2f} {stats['win_rate']:>9.1%} "
+              f"{stats['guesses_per_game']:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
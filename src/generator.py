@@ -0,0 +1,171 @@
+"""
+Seeded generator of consistent minesweeper states
+
+Random boards (like benchmark.random_boards) are mostly impossible: their
+numbers do not match any mine layout. This generator samples a real mine
+layout first, derives every number from it and then hides squares, so every
+board it makes has at least one mine layout that satisfies it (the one it was
+made from):
+-windows: 5x5 states cut out of a 7x7 layout, so the numbers on the edge of
+ the window count mines outside of it like a window of a real game. The
+ middle square is always unknown since it is the square being solved for
+-boards: full boards of any size with an exact number of mines
+
+Every mine is kept as an unknown square or shown as a known mine (flag), and
+every safe square is revealed or hidden, with controllable probabilities.
+Boards are generated one at a time, so any number of them can be streamed
+
+Run 'python src/generator.py --help' to write boards as JSON lines (the input
+format of 'python src/run.py solve')
+"""
+
+from argparse import ArgumentParser, FileType
+import json
+from operator import itemgetter
+from random import Random
+import sys
+from typing import Iterator, List
+from direct import ADJACENT
+from packed import PackedState
+
+# Positions (row * 7 + column) of the 5x5 window inside a 7x7 layout, and of
+# the neighbours of each of these squares
+_WINDOW = [(i + 1) * 7 + j + 1 for i in range(5) for j in range(5)]
+_WINDOW_NEIGHBOURS = [itemgetter(*[position + di * 7 + dj for di, dj in ADJACENT])
+                      for position in _WINDOW]
+_MIDDLE = 12  # Position of the middle square in the 5x5 window
+
+# Hexadecimal digit (value + 2) of each square value, see PackedState
+_DIGITS = '0123456789a'
+
+
+def _check_probability(name: str, value: float):
+    """
+    Raises an exception if a probability is not in the range [0, 1]
+
+    @param name: name of the parameter
+    @param value: the probability
+    """
+    if not isinstance(value, (int, float)) or not 0 <= value <= 1:
+        raise Exception(f"error: {name} must be a number in the range [0, 1]")
+
+
+def _square(rng: Random, mine: bool, number: int, reveal: float, flag: float) -> int:
+    """
+    Returns the value shown for a square
+
+    @param rng: the random number generator
+    @param mine: whether the square has a mine
+    @param number: the number of mines adjacent to the square
+    @param reveal: probability that a safe square is revealed
+    @param flag: probability that a mine is shown as a known mine
+    @return -2 (known mine), -1 (unknown) or the square's number
+    """
+    if mine:
+        return -2 if rng.random() < flag else -1
+    return number if rng.random() < reveal else -1
+
+
+def windows(count: int = None, seed: int = 204, mine_density: float = 0.2,
+            reveal: float = 0.7, flag: float = 0.3, packed: bool = True) -> Iterator:
+    """
+    Generates consistent 5x5 states
+
+    @param count: number of states (None for an endless stream)
+    @param seed: seed of the random number generator
+    @param mine_density: probability that each square of the layout is a mine
+    @param reveal: probability that a safe square is revealed
+    @param flag: probability that a mine is shown as a known mine
+    @param packed: True to generate PackedState objects, False for 5x5 lists
+    @return an iterator over the states
+    """
+    for name, value in [('mine density', mine_density), ('reveal', reveal), ('flag', flag)]:
+        _check_probability(name, value)
+    rng = Random(seed)
+    random = rng.random
+    generated = 0
+    while count is None or generated < count:
+        mines = [random() < mine_density for _ in range(49)]
+        digits = []
+        for n, position in enumerate(_WINDOW):
+            # Same as _square, inlined since this loop runs for every square
+            if n == _MIDDLE:
+                square = -1
+            elif mines[position]:
+                square = -2 if random() < flag else -1
+            else:
+                square = sum(_WINDOW_NEIGHBOURS[n](mines)) if random() < reveal else -1
+            digits.append(_DIGITS[square + 2])
+        key = int(''.join(digits), 16)
+        if packed:
+            yield PackedState(key)
+        else:
+            yield PackedState(key).to_list()
+        generated += 1
+
+
+def boards(count: int = None, rows: int = 16, cols: int = 30, mines: int = 99,
+           seed: int = 204, reveal: float = 0.7, flag: float = 0.3) -> Iterator[List[List[int]]]:
+    """
+    Generates consistent boards of any size (expert boards by default)
+
+    @param count: number of boards (None for an endless stream)
+    @param rows: number of rows
+    @param cols: number of columns
+    @param mines: exact number of mines in each layout
+    @param seed: seed of the random number generator
+    @param reveal: probability that a safe square is revealed
+    @param flag: probability that a mine is shown as a known mine
+    @return an iterator over the boards
+    """
+    if not rows > 0 < cols or not 0 <= mines <= rows * cols:
+        raise Exception("error: a board needs a positive size and between 0 and "
+                        "rows * columns mines")
+    _check_probability('reveal', reveal)
+    _check_probability('flag', flag)
+    rng = Random(seed)
+    squares = [(i, j) for i in range(rows) for j in range(cols)]
+    generated = 0
+    while count is None or generated < count:
+        layout = set(rng.sample(squares, mines))
+        grid = []
+        for i in range(rows):
+            row = []
+            for j in range(cols):
+                number = sum((i + di, j + dj) in layout for di, dj in ADJACENT)
+                row.append(_square(rng, (i, j) in layout, number, reveal, flag))
+            grid.append(row)
+        yield grid
+        generated += 1
+
+
+def main():
+    """
+    Writes generated boards as JSON lines from the command line
+    """
+    parser = ArgumentParser(description="Generate consistent minesweeper states")
+    parser.add_argument('kind', choices=['windows', 'boards'])
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=204)
+    parser.add_argument('--mine-density', type=float, default=0.2, help="windows only")
+    parser.add_argument('--size', type=int, nargs=3, default=[16, 30, 99],
+                        metavar=('ROWS', 'COLS', 'MINES'), help="boards only")
+    parser.add_argument('--reveal', type=float, default=0.7,
+                        help="probability that a safe square is revealed")
+    parser.add_argument('--flag', type=float, default=0.3,
+                        help="probability that a mine is shown as a known mine")
+    parser.add_argument('--output', type=FileType('w'), default=sys.stdout)
+    args = parser.parse_args()
+
+    if args.kind == 'windows':
+        generated = windows(args.count, args.seed, args.mine_density, args.reveal,
+                            args.flag, packed=False)
+    else:
+        generated = boards(args.count, *args.size, args.seed, args.reveal, args.flag)
+    with args.output:
+        for grid in generated:
+            args.output.write(json.dumps(grid) + '\n')
+
+
+if __name__ == '__main__':
+    main()
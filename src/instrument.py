@@ -0,0 +1,251 @@
+"""
+Opt-in instrumentation of the solve pipeline
+
+While a Profiler is active (used as a context manager), every board solved by
+MinesweeperState records how long it spent in each phase and some counts:
+    phases: initial_state (the unit facts of every square), truth_encodings
+            (the middle square constraints), cnf (converting the encoding to
+            CNF), backend (the SAT solver), decode (get_solution) and engine
+            (the whole solve, for engines without an encoding)
+    counts: constraints, variables, backend_calls and cache_hits (results
+            reused from an Encoding or a verdict cache)
+The per board values are aggregated into histograms that can be exported as
+JSON. When no profiler is active the hooks only check a global, so the
+overhead is a function call per hook (check instrument.active directly
+before computing an expensive count)
+
+summarize turns latency samples into the percentile summary reported by the
+benchmark suite and the solving service
+"""
+
+from contextlib import nullcontext
+import json
+from math import ceil
+from statistics import mean
+from time import perf_counter
+from typing import Callable, Dict, Iterable
+
+active = None  # The profiler currently recording, if any
+
+_DISABLED = nullcontext()  # Shared by every hook while nothing is recording
+
+
+class Histogram:
+    """
+    Counts values in power of 2 buckets, keeping their total, minimum and
+    maximum
+    """
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}  # Upper bound -> number of values
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value: float):
+        """
+        Adds a value to the histogram
+
+        @param value: a non negative value
+        """
+        bound = 1 << max(0, ceil(value) - 1).bit_length()  # Smallest power of 2 >= value
+        self.buckets[bound] = self.buckets.get(bound, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def to_dict(self) -> dict:
+        """
+        Returns the histogram as a JSON compatible dictionary
+
+        @return a dictionary with the count, total, mean, minimum, maximum and
+                the number of values at most each bucket's bound (and above
+                the previous bound)
+        """
+        return {'count': self.count, 'total': self.total,
+                'mean': self.total / self.count if self.count else 0.0,
+                'min': self.min, 'max': self.max,
+                'buckets': {str(bound): self.buckets[bound] for bound in sorted(self.buckets)}}
+
+
+def summarize(samples: Iterable[float]) -> Dict[str, float]:
+    """
+    Summarizes latency samples (in seconds) as microsecond statistics
+
+    @param samples: the latency of each run
+    @return a dictionary with the mean and the 50th, 90th, 99th percentiles
+            and maximum latency
+    """
+    ordered = sorted(samples)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1e6
+
+    return {'mean_us': mean(ordered) * 1e6, 'p50_us': percentile(50),
+            'p90_us': percentile(90), 'p99_us': percentile(99),
+            'max_us': ordered[-1] * 1e6}
+
+
+class _Timer:
+    """
+    Adds the time spent in a with block to a phase of the current board
+    """
+
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler: 'Profiler', name: str):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = perf_counter()
+
+    def __exit__(self, *_):
+        self.profiler.add_time(self.name, perf_counter() - self.start)
+
+
+class _Board:
+    """
+    Groups the phases and counts recorded in a with block into one board
+    """
+
+    __slots__ = ('profiler',)
+
+    def __init__(self, profiler: 'Profiler'):
+        self.profiler = profiler
+
+    def __enter__(self):
+        self.profiler.start_board()
+
+    def __exit__(self, *_):
+        self.profiler.end_board()
+
+
+class Profiler:
+    """
+    Records the phases and counts of every board solved while it is active
+    """
+
+    def __init__(self, callback: Callable[[dict], None] = None):
+        """
+        @param callback: called with the record of each board when it is done
+                         (a dictionary with the 'phases' in microseconds and
+                         the 'counts')
+        """
+        self.callback = callback
+        self.boards = 0
+        self.phases: Dict[str, Histogram] = {}  # Microseconds per board
+        self.counts: Dict[str, Histogram] = {}  # Count per board
+        self.__record = None  # Record of the board being solved
+        self.__depth = 0  # Nested boards are part of the outer board
+        self.__previous = None  # Profiler that was active before this one
+
+    def __enter__(self) -> 'Profiler':
+        global active  # pylint: disable=global-statement
+        self.__previous, active = active, self
+        return self
+
+    def __exit__(self, *_):
+        global active  # pylint: disable=global-statement
+        active = self.__previous
+
+    def start_board(self):
+        """
+        Starts recording a board
+        """
+        self.__depth += 1
+        if self.__depth == 1:
+            self.__record = {'phases': {}, 'counts': {}, 'start': perf_counter()}
+
+    def end_board(self):
+        """
+        Stops recording a board and adds its record to the histograms
+        """
+        self.__depth -= 1
+        if self.__depth > 0 or self.__record is None:
+            return
+        record, self.__record = self.__record, None
+        record['phases']['total'] = perf_counter() - record.pop('start')
+        record['phases'] = {name: seconds * 1e6 for name, seconds in record['phases'].items()}
+        self.boards += 1
+        for section, histograms in [('phases', self.phases), ('counts', self.counts)]:
+            for name, value in record[section].items():
+                histograms.setdefault(name, Histogram()).add(value)
+        if self.callback is not None:
+            self.callback(record)
+
+    def add_time(self, name: str, seconds: float):
+        """
+        Adds time to a phase of the current board (ignored between boards)
+
+        @param name: the phase
+        @param seconds: the time spent in the phase
+        """
+        if self.__record is not None:
+            phases = self.__record['phases']
+            phases[name] = phases.get(name, 0.0) + seconds
+
+    def count(self, name: str, n: int = 1):
+        """
+        Adds to a count of the current board (ignored between boards)
+
+        @param name: the count
+        @param n: the amount to add
+        """
+        if self.__record is not None:
+            counts = self.__record['counts']
+            counts[name] = counts.get(name, 0) + n
+
+    def to_dict(self) -> dict:
+        """
+        Returns the aggregated histograms
+
+        @return a JSON compatible dictionary with the number of boards, the
+                phase histograms (microseconds) and the count histograms
+        """
+        return {'boards': self.boards,
+                'phases': {name: histogram.to_dict() for name, histogram in self.phases.items()},
+                'counts': {name: histogram.to_dict() for name, histogram in self.counts.items()}}
+
+    def export(self, path: str):
+        """
+        Writes the aggregated histograms to a JSON file
+
+        @param path: path of the file
+        """
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+
+def board():
+    """
+    Returns a context manager grouping what is recorded inside it into one
+    board of the active profiler
+
+    @return the context manager (a shared no-op one if nothing is recording)
+    """
+    return _DISABLED if active is None else _Board(active)
+
+
+def phase(name: str):
+    """
+    Returns a context manager timing a phase of the current board
+
+    @param name: the phase
+    @return the context manager (a shared no-op one if nothing is recording)
+    """
+    return _DISABLED if active is None else _Timer(active, name)
+
+
+def count(name: str, n: int = 1):
+    """
+    Adds to a count of the current board, if a profiler is active
+
+    @param name: the count
+    @param n: the amount to add
+    """
+    if active is not None:
+        active.count(name, n)
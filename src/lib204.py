@@ -1,40 +1,163 @@
-from nnf import And, dsharp, NNF, config
+from nnf import And, Or, Var, dsharp, NNF, config, true, false
+import instrument
 
 
 class Encoding(object):
     def __init__(self):
         self.constraints = []
+        # Results derived from the constraints, cleared whenever they change.
+        # Change constraints with add_constraint and replace_constraint (not
+        # by editing the list) so the cache stays correct
+        self.cache = {}
+        # Number of times each backend was run for this encoding
+        self.backend_calls = {'sat': 0, 'dsharp': 0}
+
+    def theory(self):
+        if 'theory' not in self.cache:
+            self.cache['theory'] = And(self.constraints)
+        return self.cache['theory']
+
+    def cnf(self):
+        if 'cnf' not in self.cache:
+            with instrument.phase('cnf'):
+                self.cache['cnf'] = self.theory().to_CNF()
+        return self.cache['cnf']
+
+    def needs_cnf(self):
+        # nnf solves CNF and decomposable sentences directly, anything else is
+        # converted to CNF first (done here so the conversion is cached)
+        theory = self.theory()
+        return not (theory.is_CNF() or theory.decomposable())
 
     def vars(self):
-        ret = set()
-        for c in self.constraints:
-            ret |= c.vars()
-        return ret
+        if 'vars' not in self.cache:
+            ret = set()
+            for c in self.constraints:
+                ret |= c.vars()
+            self.cache['vars'] = frozenset(ret)
+        return set(self.cache['vars'])
 
     def size(self):
-        return sum([c.size() for c in self.constraints])
+        if 'size' not in self.cache:
+            self.cache['size'] = sum([c.size() for c in self.constraints])
+        return self.cache['size']
 
     def valid(self):
-        return And(self.constraints).valid()
+        return self.theory().valid()
 
     def negate(self):
-        return And(self.constraints).negate()
+        return self.theory().negate()
 
     def add_constraint(self, c):
         assert isinstance(c, NNF), "Constraints need to be of type NNF"
         self.constraints.append(c)
+        self.cache.clear()
+
+    def replace_constraint(self, index, c):
+        assert isinstance(c, NNF), "Constraints need to be of type NNF"
+        self.constraints[index] = c
+        self.cache.clear()
+
+    @staticmethod
+    def counter(variables, bound):
+        # Sequential counter: registers[j] after the first i variables is true
+        # iff at least j + 1 of them are true. Registers are defined with iff (not
+        # just implied), so the auxiliary variables never change model counts
+        clauses = []
+        previous = []
+        for i, x in enumerate(variables):
+            current = []
+            for j in range(min(i + 1, bound)):
+                a = previous[j] if j < len(previous) else None  # None is false
+                b = previous[j - 1] if j > 0 else None  # None is true
+                r = Var.aux()
+                # r <-> a | (x & b)
+                clauses.append(Or([~x, r] if b is None else [~x, ~b, r]))
+                if a is not None:
+                    clauses.append(Or([~a, r]))
+                clauses.append(Or([~r, x] if a is None else [~r, a, x]))
+                if b is not None:
+                    clauses.append(Or([~r, b] if a is None else [~r, a, b]))
+                current.append(r)
+            previous = current
+        return previous, clauses
+
+    def cardinality(self, variables, at_least, at_most):
+        variables = list(variables)
+        if at_least > at_most or at_least > len(variables) or at_most < 0:
+            return false
+        if at_least <= 0 and at_most >= len(variables):
+            return true
+        registers, clauses = self.counter(variables, at_most + 1)
+        if at_least > 0:
+            clauses.append(registers[at_least - 1])
+        if at_most < len(variables):
+            clauses.append(~registers[at_most])
+        return And(clauses)
+
+    def add_at_least(self, variables, k):
+        variables = list(variables)
+        self.add_constraint(self.cardinality(variables, k, len(variables)))
+
+    def add_at_most(self, variables, k):
+        self.add_constraint(self.cardinality(variables, 0, k))
+
+    def add_exactly(self, variables, k):
+        self.add_constraint(self.cardinality(variables, k, k))
 
     @config(sat_backend="kissat")
     def is_satisfiable(self):
-        return And(self.constraints).satisfiable()
+        # A model from solve already answers this
+        if 'satisfiable' not in self.cache:
+            T = self.cnf() if self.needs_cnf() else self.theory()
+            self.backend_calls['sat'] += 1
+            instrument.count('backend_calls')
+            with instrument.phase('backend'):
+                self.cache['satisfiable'] = T.satisfiable()
+        else:
+            instrument.count('cache_hits')
+        return self.cache['satisfiable']
 
     @config(sat_backend="kissat")
     def solve(self):
-        return And(self.constraints).solve()
+        if 'model' not in self.cache:
+            if self.cache.get('satisfiable') is False:
+                self.cache['model'] = None
+                instrument.count('cache_hits')
+            else:
+                convert = self.needs_cnf()
+                T = self.cnf() if convert else self.theory()
+                self.backend_calls['sat'] += 1
+                instrument.count('backend_calls')
+                with instrument.phase('backend'):
+                    model = T.solve()
+                if convert and model is not None:
+                    # Same as nnf: auxiliary variables of the conversion are
+                    # dropped and variables it removed can be anything
+                    model = {name: model.get(name, True) for name in self.vars()}
+                self.cache['model'] = model
+            self.cache['satisfiable'] = self.cache['model'] is not None
+        else:
+            instrument.count('cache_hits')
+        model = self.cache['model']
+        return None if model is None else dict(model)
 
     def count_solutions(self, lst):
-        T = And(self.constraints + lst)
-        return dsharp.compile(T.to_CNF(), executable='bin/dsharp').model_count()
+        # The constraints are only converted to CNF once; the extra
+        # constraints are converted on their own and their clauses added
+        counts = self.cache.setdefault('counts', {})
+        key = frozenset(lst)
+        if key not in counts:
+            clauses = set(self.cnf().children)
+            for c in lst:
+                clauses |= c.to_CNF().children
+            self.backend_calls['dsharp'] += 1
+            instrument.count('backend_calls')
+            with instrument.phase('backend'):
+                counts[key] = dsharp.compile(And(clauses), executable='bin/dsharp').model_count()
+        else:
+            instrument.count('cache_hits')
+        return counts[key]
 
     def likelihood(self, lit):
         return self.count_solutions([lit]) / self.count_solutions([])
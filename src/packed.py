@@ -0,0 +1,149 @@
+"""
+Compact 5x5 minesweeper state
+
+Stores a whole board in a single integer with 4 bits per square (value + 2,
+top left square in the most significant bits), the same layout as
+cache.pack. It supports the same set_square, set_row and print_state methods
+as MinesweeperState, is hashable and can be given to every solving engine
+"""
+
+from typing import List, Tuple
+
+
+def check_row_number(i: int):
+    """
+    Raises an exception if a row number is not an integer in the range [0, 4]
+
+    @param i: row number
+    """
+    if not isinstance(i, int) or not 0 <= i <= 4:
+        raise Exception("error: column number must be an integer in the range [0, 4]")
+
+
+def check_square(i: int, j: int, new_value: int):
+    """
+    Raises an exception if a square's position or value is not in the correct
+    range (the check done by set_square of MinesweeperState and PackedState)
+
+    @param i: column number
+    @param j: row number
+    @param new_value: a new value for the square
+    """
+    check_row_number(i)
+    if not isinstance(j, int) or not 0 <= j <= 4:
+        raise Exception("error: row number must be an integer in the range [0, 4]")
+    if not isinstance(new_value, int) or not -2 <= new_value <= 8:
+        raise Exception("error: new value must be an integer in the range [-2, 8]")
+
+
+def check_row(row: List):
+    """
+    Raises an exception if a row does not have 5 integers in the range [-2, 8]
+    (the check done by set_row of MinesweeperState and PackedState)
+
+    @param row: a row of squares
+    """
+    if not isinstance(row, list) or len(row) != 5 \
+            or not all(isinstance(square, int) and -2 <= square <= 8 for square in row):
+        raise Exception("error: new row must have 5 integers in the range [-2, 8]")
+
+
+class PackedState:
+    """
+    A 5x5 minesweeper state packed into one integer. Rows are read with
+    state[i] (a tuple) so engines can read squares with state[i][j]. The hash
+    changes when a square is set, so a state must not be changed while it is
+    used as a dictionary key or set member
+    """
+
+    __slots__ = ('key', 'state_num')
+
+    def __init__(self, new_state=None, num=-1):
+        """
+        @param new_state: a 5x5 list of squares, a packed integer or None for a
+                          board of unknown squares
+        @param num: number for predefined states (-1 for custom)
+        """
+        self.state_num = num
+        if new_state is None:
+            self.key = int('1' * 25, 16)  # Every square is unknown (-1 + 2)
+        elif isinstance(new_state, int):
+            if not 0 <= new_state < 1 << 100 or \
+                    any(digit not in '0123456789a' for digit in f"{new_state:025x}"):
+                raise Exception("error: packed state must have 25 squares in the range [-2, 8]")
+            self.key = new_state
+        else:
+            if not isinstance(new_state, list) or len(new_state) != 5:
+                raise Exception("error: a state must have 5 rows")
+            self.key = 0
+            for i, row in enumerate(new_state):
+                self.set_row(i, row)
+
+    def __getitem__(self, i: int) -> Tuple[int, ...]:
+        if not -5 <= i < 5:
+            raise IndexError("row number out of range")
+        shift = 4 * (4 - i % 5) * 5
+        row = self.key >> shift
+        return tuple(((row >> (4 * (4 - j))) & 0xF) - 2 for j in range(5))
+
+    def __len__(self) -> int:
+        return 5
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, PackedState) and self.key == other.key
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    def __repr__(self) -> str:
+        return f"PackedState({self.to_list()})"
+
+    def to_list(self) -> List[List[int]]:
+        """
+        Unpacks this state into a 5x5 list of squares
+
+        @return the 5x5 minesweeper state
+        """
+        digits = f"{self.key:025x}"
+        return [[int(digit, 16) - 2 for digit in digits[i * 5:i * 5 + 5]] for i in range(5)]
+
+    def set_square(self, i: int, j: int, new_value: int):
+        """
+        Sets a specified square in this state to a specified value, raising an
+        exception if a parameter is not in the correct range
+
+        @param i: column number
+        @param j: row number
+        @param new_value: a new value for the square
+        """
+        check_square(i, j, new_value)
+        shift = 4 * (24 - (i * 5 + j))
+        self.key = self.key & ~(0xF << shift) | (new_value + 2) << shift
+
+    def set_row(self, i: int, new_row: List):
+        """
+        Sets the specified row to a new row, raising an exception if a parameter
+        is not in the correct range
+
+        @param i: row number
+        @param new_row: the new row of squares
+        """
+        check_row_number(i)
+        check_row(new_row)
+        row = 0
+        for square in new_row:
+            row = row << 4 | (square + 2)
+        shift = 4 * (4 - i) * 5
+        self.key = self.key & ~(0xFFFFF << shift) | row << shift
+
+    def print_state(self):
+        """
+        Prints the minesweeper state similar to how it would look in a real game
+        (see MinesweeperState.print_state)
+        """
+        print(f"\nSTATE {str(self.state_num)}:")
+        print("-----------")
+        for row in self.to_list():
+            print('|' + ' '.join('M' if square == -2 else '?' if square == -1 else str(square)
+                                 for square in row) + '|')
+        print("-----------\n")
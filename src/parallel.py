@@ -0,0 +1,245 @@
+"""
+Parallel solver for large collections of 5x5 minesweeper states
+
+Boards are split into chunks that are solved by a pool of worker processes.
+Only a bounded number of chunks is in flight at once, so the input can be an
+arbitrarily long stream, and results are returned in the same order as the
+boards were given
+"""
+
+from argparse import ArgumentParser
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from os import cpu_count
+from random import Random
+from time import perf_counter
+from typing import Iterable, Iterator, List, Tuple
+from state import solve_many
+
+
+# Persistent caches opened by this worker process, by (path, engine)
+_caches = {}
+
+
+def _cache(path: str, engine: str):
+    """
+    Returns this process' persistent cache for a file, opening it the first
+    time. Each worker opens its own connection (see persistent_cache.py)
+
+    @param path: path of the SQLite database
+    @param engine: the engine used to solve boards that are not cached
+    @return the PersistentCache
+    """
+    if (path, engine) not in _caches:
+        # Imported here so SQLite is only loaded when a cache is requested
+        from persistent_cache import PersistentCache  # pylint: disable=import-outside-toplevel
+        _caches[(path, engine)] = PersistentCache(
+            path, solver=lambda board: solve_many([board], engine)[0])
+    return _caches[(path, engine)]
+
+
+def _solve_boards(boards: List[List[List[int]]], engine: str, cache_path: str) -> List[str]:
+    """
+    Solves boards with an engine, through a persistent cache if one is given
+
+    @param boards: a list of 5x5 minesweeper states
+    @param engine: the engine used to solve each board (see state.solve_many)
+    @param cache_path: path of a persistent cache, or None to not use one
+    @return the solution of each board
+    """
+    if cache_path:
+        cache = _cache(cache_path, engine)
+        return [cache.get(board) for board in boards]
+    return solve_many(boards, engine)
+
+
+def _solve_chunk(chunk: List[List[List[int]]], engine: str, cache_path: str = None) -> List[str]:
+    """
+    Solves a chunk of boards in a worker process. If the chunk fails, each
+    board is solved on its own so one bad board only fails itself
+
+    @param chunk: a list of 5x5 minesweeper states
+    @param engine: the engine used to solve each board (see state.solve_many)
+    @param cache_path: path of a persistent cache shared by the workers (see
+                       persistent_cache.py), or None to not use one
+    @return the solution of each board, or an error message for boards that
+            could not be solved
+    """
+    try:
+        return _solve_boards(chunk, engine, cache_path)
+    except Exception:  # pylint: disable=broad-except
+        pass
+
+    results = []
+    for board in chunk:
+        try:
+            results += _solve_boards([board], engine, cache_path)
+        except Exception as error:  # pylint: disable=broad-except
+            # The repo's messages start with "error:", others (like a TypeError
+            # for a square that is not a number) get the prefix here so every
+            # error can be told apart from a solution
+            message = str(error)
+            results.append(message if message.startswith("error:") else f"error: {message}")
+    return results
+
+
+def _shutdown(executor: ProcessPoolExecutor, pending: deque):
+    """
+    Cancels the pending chunks of a pool and shuts it down without waiting
+
+    @param executor: the pool of worker processes
+    @param pending: the (chunk, future) pairs that have not been returned yet
+    """
+    for _, future in pending:
+        if future is not None:
+            future.cancel()
+    executor.shutdown(wait=False)
+
+
+def _solve_alone(executor: ProcessPoolExecutor, workers: int, chunk: List[List[List[int]]],
+                 engine: str, cache_path: str,
+                 retries: int) -> Tuple[List[str], ProcessPoolExecutor]:
+    """
+    Solves a chunk while nothing else runs in the pool, so if a worker dies the
+    chunk is the one that killed it. A chunk that keeps killing workers is
+    split into single boards, so only the boards that kill a worker on their
+    own get an error message
+
+    @param executor: the pool of worker processes
+    @param workers: number of worker processes of a new pool
+    @param chunk: a list of 5x5 minesweeper states
+    @param engine: the engine used to solve each board (see state.solve_many)
+    @param cache_path: path of a persistent cache, or None to not use one
+    @param retries: number of times a chunk or board is run again after it
+                    killed a worker
+    @return a tuple with the solution (or error message) of each board and the
+            pool (a new one if the old one broke)
+    """
+    for _ in range(retries + 1):
+        try:
+            return executor.submit(_solve_chunk, chunk, engine, cache_path).result(), executor
+        except BrokenProcessPool:
+            executor.shutdown(wait=False)
+            executor = ProcessPoolExecutor(workers)
+    if len(chunk) == 1:
+        return ["error: worker process died"], executor
+    results = []
+    for board in chunk:
+        solution, executor = _solve_alone(executor, workers, [board], engine, cache_path,
+                                          retries)
+        results += solution
+    return results, executor
+
+
+def _succeeded(future: Future) -> bool:
+    """
+    Returns whether a future finished with a result (not an exception)
+
+    @param future: a future, or None for a chunk that could not be submitted
+    @return True if the future has a result
+    """
+    return future is not None and future.done() and not future.cancelled() \
+        and future.exception() is None
+
+
+def solve_parallel(boards: Iterable[List[List[int]]], workers: int = None,
+                   engine: str = 'sat', chunksize: int = 64,
+                   retries: int = 1, cache_path: str = None) -> Iterator[str]:
+    """
+    Solves a stream of 5x5 boards with a pool of worker processes, yielding
+    each solution in the same order as the boards
+
+    If a worker process dies (which breaks the whole pool), a new pool is
+    started and the chunks that were not finished are run one at a time to
+    find the one that killed the worker (see _solve_alone); only boards that
+    kill a worker on their own, retries + 1 times, get an error message. The
+    other chunks then go back to running in parallel
+
+    @param boards: an iterable of 5x5 minesweeper states
+    @param workers: number of worker processes (defaults to the CPU count)
+    @param engine: the engine used to solve each board (see state.solve_many)
+    @param chunksize: number of boards sent to a worker at once
+    @param retries: number of times a chunk or board that killed a worker
+                    while running alone is run again
+    @param cache_path: path of a persistent cache (see persistent_cache.py)
+                       shared by the workers, or None to not use one
+    @return an iterator over the solution of each board
+    """
+    workers = workers or cpu_count() or 1
+    if workers < 1 or chunksize < 1:
+        raise Exception("error: workers and chunk size must be positive integers")
+
+    boards = iter(boards)
+    max_pending = workers * 2  # Chunks in flight, bounds memory use
+    pending = deque()  # (chunk, future) in input order
+    executor = ProcessPoolExecutor(workers)
+    try:
+        while True:
+            while len(pending) < max_pending:
+                chunk = list(islice(boards, chunksize))
+                if not chunk:
+                    break
+                try:
+                    future = executor.submit(_solve_chunk, chunk, engine, cache_path)
+                except BrokenProcessPool:
+                    future = None  # Recovered below with the other chunks
+                pending.append((chunk, future))
+            if not pending:
+                return
+
+            chunk, future = pending[0]
+            try:
+                if future is None:
+                    raise BrokenProcessPool("the pool broke before the chunk was submitted")
+                results = future.result()
+            except BrokenProcessPool:
+                _shutdown(executor, pending)
+                executor = ProcessPoolExecutor(workers)
+                recovered = deque()
+                for chunk, future in pending:
+                    if not _succeeded(future):
+                        future = Future()
+                        results, executor = _solve_alone(executor, workers, chunk, engine,
+                                                         cache_path, retries)
+                        future.set_result(results)
+                    recovered.append((chunk, future))
+                pending = recovered
+                continue
+            pending.popleft()
+            yield from results
+    finally:
+        _shutdown(executor, pending)
+
+
+def main():
+    """
+    Measures the throughput of solve_parallel for different worker counts on
+    seeded random boards and prints the speedup over a single worker
+    """
+    parser = ArgumentParser(description="Measure parallel solving speedup")
+    parser.add_argument('--boards', type=int, default=2000, help="number of boards")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--engine', default='sat', help="engine used by the workers")
+    parser.add_argument('--chunksize', type=int, default=64)
+    parser.add_argument('--seed', type=int, default=204)
+    args = parser.parse_args()
+
+    rng = Random(args.seed)
+    boards = [[[rng.randint(-2, 8) for _ in range(5)] for _ in range(5)]
+              for _ in range(args.boards)]
+
+    base = None
+    print(f"{'workers':>8} {'boards/s':>12} {'speedup':>8}")
+    for workers in args.workers:
+        start = perf_counter()
+        for _ in solve_parallel(boards, workers, args.engine, args.chunksize):
+            pass
+        rate = args.boards / (perf_counter() - start)
+        base = base or rate
+        print(f"{workers:>8} {rate:>12.1f} {rate / base:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
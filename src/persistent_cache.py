@@ -0,0 +1,212 @@
+"""
+Persistent verdict cache for 5x5 minesweeper states
+
+Stores the solution of each board (and the mine probability of its middle
+square, when computed) in a SQLite file so that solutions are shared between
+runs and between processes. Boards are stored by their canonical packed key
+(see cache.py), so rotations and reflections of a board share one entry. The
+database uses write-ahead logging, which lets many processes read while one
+writes, and the least recently used entries are evicted once it is full
+"""
+
+import os
+import sqlite3
+from time import time
+from typing import Callable, Iterable, List, Optional
+from cache import canonical_key
+import direct
+import instrument
+from predefined_states import state_list
+import probability
+
+
+class PersistentCache:
+    """
+    A SQLite backed board -> solution cache with a size cap
+    """
+
+    def __init__(self, path: str = 'verdicts.sqlite', max_entries: int = 1000000,
+                 solver: Callable[[List[List[int]]], str] = direct.classify,
+                 refresh_interval: float = 3600):
+        """
+        @param path: path of the SQLite database (created if it does not exist)
+        @param max_entries: maximum number of stored boards
+        @param solver: function used to solve boards that are not cached
+        @param refresh_interval: seconds before a hit updates an entry's last
+                                 use time (so most hits do not need a write)
+        """
+        if not isinstance(max_entries, int) or max_entries < 1:
+            raise Exception("error: cache size must be a positive integer")
+        self.path = path
+        self.max_entries = max_entries
+        self.solver = solver
+        self.refresh_interval = refresh_interval
+        self.hits = 0
+        self.misses = 0
+        self.__connection = None
+        self.__pid = None  # Process that opened the connection
+        self.__inserts = 0  # Inserts since the size was last checked
+
+    def __connect(self) -> sqlite3.Connection:
+        """
+        Returns this process' connection to the database, opening it (and
+        creating the table) if needed. Connections cannot be shared between
+        processes, so a forked worker opens its own
+
+        @return the SQLite connection
+        """
+        if self.__connection is None or self.__pid != os.getpid():
+            self.__connection = sqlite3.connect(self.path, timeout=30,
+                                                isolation_level=None)
+            self.__pid = os.getpid()
+            self.__connection.execute("PRAGMA journal_mode=WAL")
+            self.__connection.execute("PRAGMA synchronous=NORMAL")
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS verdicts ("
+                "key BLOB PRIMARY KEY, verdict TEXT, probability REAL, "
+                "last_used REAL NOT NULL)")
+            self.__connection.execute(
+                "CREATE INDEX IF NOT EXISTS verdicts_last_used ON verdicts (last_used)")
+        return self.__connection
+
+    @staticmethod
+    def key(state: List[List[int]]) -> bytes:
+        """
+        Returns the database key of a board (its canonical key as 13 bytes,
+        since it does not fit in a SQLite integer)
+
+        @param state: a 5x5 minesweeper state
+        @return the key
+        """
+        return canonical_key(state).to_bytes(13, 'big')
+
+    def __lookup(self, key: bytes, column: str):
+        """
+        Returns a stored value, refreshing the entry's last use time if it is
+        older than the refresh interval
+
+        @param key: the database key of a board
+        @param column: 'verdict' or 'probability'
+        @return the stored value, or None if it is not stored
+        """
+        connection = self.__connect()
+        row = connection.execute(f"SELECT {column}, last_used FROM verdicts WHERE key = ?",
+                                 (key,)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        now = time()
+        if now - row[1] > self.refresh_interval:
+            connection.execute("UPDATE verdicts SET last_used = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def __store(self, key: bytes, column: str, value):
+        """
+        Stores a value for a board, evicting the least recently used entries
+        if the cache is over its size cap
+
+        @param key: the database key of a board
+        @param column: 'verdict' or 'probability'
+        @param value: the value to store
+        """
+        connection = self.__connect()
+        connection.execute(
+            f"INSERT INTO verdicts (key, {column}, last_used) VALUES (?, ?, ?) "
+            f"ON CONFLICT (key) DO UPDATE SET {column} = excluded.{column}, "
+            "last_used = excluded.last_used", (key, value, time()))
+
+        # Counting rows is slow on a big table, so the size is only checked
+        # every so often and entries are evicted in batches of 10%
+        self.__inserts += 1
+        if self.__inserts >= max(1, self.max_entries // 100):
+            self.__inserts = 0
+            size = connection.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0]
+            if size > self.max_entries:
+                excess = size - self.max_entries * 9 // 10
+                connection.execute(
+                    "DELETE FROM verdicts WHERE key IN (SELECT key FROM verdicts "
+                    "ORDER BY last_used LIMIT ?)", (excess,))
+
+    def get(self, state: List[List[int]]) -> str:
+        """
+        Returns the solution of a board, solving and storing it if it is not
+        cached
+
+        @param state: a 5x5 minesweeper state
+        @return the english representation of the solution
+        """
+        with instrument.board():
+            key = self.key(state)
+            result = self.__lookup(key, 'verdict')
+            if result is not None:
+                self.hits += 1
+                instrument.count('cache_hits')
+                return result
+            self.misses += 1
+            result = self.solver(state)
+            self.__store(key, 'verdict', result)
+            return result
+
+    def get_probability(self, state: List[List[int]]) -> Optional[float]:
+        """
+        Returns the probability that the middle square of a board is a mine
+        (see MinesweeperState.mine_probabilities), computing and storing it if
+        it is not cached. Raises an exception (see
+        probability.mine_probabilities) if no mine layout satisfies the
+        numbers of the board; nothing is stored for such a board
+
+        @param state: a 5x5 minesweeper state
+        @return the probability, or None if the middle square is not unknown
+        """
+        with instrument.board():
+            key = self.key(state)
+            result = self.__lookup(key, 'probability')
+            if result is not None:
+                self.hits += 1
+                instrument.count('cache_hits')
+                return result
+            self.misses += 1
+            result = probability.mine_probabilities(
+                [list(row) for row in state], window=True).get((2, 2))
+            if result is not None:
+                self.__store(key, 'probability', result)
+            return result
+
+    def warm_up(self, states: Iterable[List[List[int]]] = None) -> int:
+        """
+        Solves and stores boards ahead of time
+
+        @param states: the boards to store (the predefined states by default)
+        @return the number of boards that were not already cached
+        """
+        if states is None:
+            states = [state_list[n]['state'] for n in state_list]
+        misses = self.misses
+        for state in states:
+            self.get(state)
+        return self.misses - misses
+
+    def size(self) -> int:
+        """
+        Returns the number of stored boards
+
+        @return the number of rows in the database
+        """
+        return self.__connect().execute("SELECT COUNT(*) FROM verdicts").fetchone()[0]
+
+    def info(self) -> dict:
+        """
+        Returns the cache counters for this process
+
+        @return a dictionary with the hits, misses, current size and maximum
+                size of the cache
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'size': self.size(),
+                'maxsize': self.max_entries}
+
+    def close(self):
+        """
+        Closes this process' connection to the database
+        """
+        if self.__connection is not None and self.__pid == os.getpid():
+            self.__connection.close()
+        self.__connection = None
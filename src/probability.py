@@ -0,0 +1,161 @@
+"""
+Exact mine probabilities for minesweeper states of any size
+
+Every revealed square whose neighbours are all known gives an exactly-n
+constraint over its adjacent unknown squares (n minus the adjacent known
+mines). The unknown squares next to these squares (the frontier) are split
+into independent groups that share no constraint, and the mine layouts of each
+group are counted once. Every layout that satisfies all constraints is counted
+as one model, the same way lib204.Encoding.likelihood counts models, so all of
+the probabilities come from a single count instead of two model counts (and
+two dsharp runs) per square
+"""
+
+from math import comb
+from typing import Dict, List, Tuple
+from board import adjacent_squares, check_board
+
+Square = Tuple[int, int]
+
+
+def get_constraints(grid: List[List[int]], window: bool = False) -> List[Tuple[List[Square], int]]:
+    """
+    Returns the mine count constraint of every revealed square that is next to
+    an unknown square, raising an exception if a constraint cannot be satisfied
+
+    @param grid: a minesweeper state of any size
+    @param window: True if the grid is a window cut out of a larger board, so
+                   squares on its edge have unseen neighbours and are ignored
+    @return a list of (adjacent unknown squares, number of mines among them)
+    """
+    rows, cols = len(grid), len(grid[0])
+    constraints = []
+    for i, row in enumerate(grid):
+        for j, square in enumerate(row):
+            if square < 0 or (window and not (0 < i < rows - 1 and 0 < j < cols - 1)):
+                continue
+            adjacent = adjacent_squares(grid, i, j)
+            unknowns = [(a, b) for a, b in adjacent if grid[a][b] == -1]
+            mines = square - sum(1 for a, b in adjacent if grid[a][b] == -2)
+            if not 0 <= mines <= len(unknowns):
+                raise Exception(f"error: square [{i}][{j}] has a value of "
+                                f"{square}, which no mine layout can satisfy")
+            if unknowns:
+                constraints.append((unknowns, mines))
+    return constraints
+
+
+def _groups(constraints) -> List[List[int]]:
+    """
+    Splits constraints into groups that share no unknown square
+
+    @param constraints: constraints from get_constraints
+    @return a list of groups, each a list of constraint indices
+    """
+    parent = list(range(len(constraints)))
+
+    def find(n):
+        while parent[n] != n:
+            parent[n] = parent[parent[n]]
+            n = parent[n]
+        return n
+
+    owner = {}  # Square -> index of the first constraint that contains it
+    for n, (squares, _) in enumerate(constraints):
+        for square in squares:
+            if square in owner:
+                parent[find(n)] = find(owner[square])
+            else:
+                owner[square] = n
+
+    groups = {}
+    for n in range(len(constraints)):
+        groups.setdefault(find(n), []).append(n)
+    return list(groups.values())
+
+
+def count_group(constraints) -> Tuple[int, Dict[Square, float]]:
+    """
+    Counts the mine layouts of a group of connected constraints. Squares that
+    appear in exactly the same constraints are interchangeable, so they are
+    handled together: placing k mines among n such squares counts as C(n, k)
+    layouts instead of enumerating each of them
+
+    @param constraints: the constraints of one group
+    @return a tuple with the number of layouts that satisfy every constraint
+            and the (weighted) number of those layouts in which each square is
+            a mine
+    """
+    # Squares with the same constraints form a class; classes are ordered
+    # constraint by constraint so each constraint is completed (and checked)
+    # as early as possible
+    memberships = {}
+    for n, (squares, _) in enumerate(constraints):
+        for square in squares:
+            memberships.setdefault(square, []).append(n)
+    classes = {}
+    for square, members in memberships.items():
+        classes.setdefault(tuple(members), []).append(square)
+    order = sorted(classes.items(), key=lambda item: item[0])
+
+    remaining = [len(squares) for squares, _ in constraints]  # Unassigned squares
+    needed = [mines for _, mines in constraints]  # Mines still to be placed
+    placed = [0] * len(order)  # Mines placed in each class
+    mine_counts = [0] * len(order)  # Layouts weighted by mines in each class
+    total = 0
+
+    def search(n, weight):
+        nonlocal total
+        if n == len(order):
+            total += weight
+            for k, mines in enumerate(placed):
+                mine_counts[k] += weight * mines
+            return
+        members, squares = order[n]
+        size = len(squares)
+        for c in members:
+            remaining[c] -= size
+        for mines in range(size + 1):
+            if all(0 <= needed[c] - mines <= remaining[c] for c in members):
+                for c in members:
+                    needed[c] -= mines
+                placed[n] = mines
+                search(n + 1, weight * comb(size, mines))
+                for c in members:
+                    needed[c] += mines
+        placed[n] = 0
+        for c in members:
+            remaining[c] += size
+
+    search(0, 1)
+    counts = {}
+    for (_, squares), count in zip(order, mine_counts):
+        for square in squares:
+            counts[square] = count / len(squares)
+    return total, counts
+
+
+def mine_probabilities(grid: List[List[int]], window: bool = False) -> Dict[Square, float]:
+    """
+    Computes the probability that each unknown square is a mine, counting every
+    mine layout that satisfies the revealed squares as equally likely. Unknown
+    squares that no constraint touches have a probability of 0.5
+
+    @param grid: a minesweeper state of any size
+    @param window: True if the grid is a window cut out of a larger board (see
+                   get_constraints)
+    @return a dictionary from the (row, column) of each unknown square to its
+            mine probability
+    """
+    check_board(grid)
+    constraints = get_constraints(grid, window)
+
+    probabilities = {(i, j): 0.5 for i, row in enumerate(grid)
+                     for j, square in enumerate(row) if square == -1}
+    for group in _groups(constraints):
+        total, mine_counts = count_group([constraints[n] for n in group])
+        if total == 0:
+            raise Exception("error: no mine layout satisfies every revealed square")
+        for square, count in mine_counts.items():
+            probabilities[square] = count / total
+    return probabilities
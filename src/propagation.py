@@ -0,0 +1,181 @@
+"""
+Constraint propagation engine for 5x5 minesweeper states
+
+The x and y conditions only look at one revealed square at a time, so a
+deduction that needs two numbers together (like the 1-2-1 pattern) is
+'unknown' for the other engines. This engine uses the real mine count of every
+revealed square in the inner 3x3 grid instead: each one is an exactly-k
+constraint over its unknown neighbours (squares on the edge of the window may
+have neighbours outside of it, so they are not used). The constraints are
+simplified by propagation (a constraint with no mines left makes its squares
+safe, one with as many mines as squares makes them all mines) and by subset
+reasoning (if the squares of one constraint are a subset of another's, the
+difference has the difference of their mine counts). Squares that are still
+undecided are decided by counting the mine layouts of the constraints
+connected to them (see probability.count_group). The constraints only cover
+the 5x5 window, so counting is exact and fast, and no SAT solver is needed
+
+The middle square is always treated as unknown, since it is the square being
+solved for
+"""
+
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+from direct import ADJACENT, check_state, verdict
+from packed import PackedState
+from probability import count_group
+
+Square = Tuple[int, int]
+Constraint = Tuple[FrozenSet[Square], int]  # (unknown squares, mines among them)
+
+MIDDLE = (2, 2)
+
+
+def get_constraints(state: List[List[int]]) -> Optional[Set[Constraint]]:
+    """
+    Returns the exactly-k constraint of every revealed square in the inner 3x3
+    grid that is next to an unknown square
+
+    @param state: a 5x5 minesweeper state
+    @return a set of (adjacent unknown squares, number of mines among them),
+            or None if a square has more or fewer mines than it can have
+    """
+    constraints = set()
+    for i in range(1, 4):
+        for j in range(1, 4):
+            square = state[i][j]
+            if (i, j) == MIDDLE or square < 0:
+                continue
+            unknowns = []
+            mines = square
+            for di, dj in ADJACENT:
+                adjacent = (i + di, j + dj)
+                value = -1 if adjacent == MIDDLE else state[i + di][j + dj]
+                if value == -1:
+                    unknowns.append(adjacent)
+                elif value == -2:
+                    mines -= 1
+            if not 0 <= mines <= len(unknowns):
+                return None
+            if unknowns:
+                constraints.add((frozenset(unknowns), mines))
+    return constraints
+
+
+def propagate(constraints: Set[Constraint],
+              assigned: Dict[Square, bool]) -> Optional[Set[Constraint]]:
+    """
+    Simplifies constraints until neither propagation nor subset reasoning
+    finds anything new
+
+    @param constraints: a set of exactly-k constraints
+    @param assigned: squares already known to be mines (True) or safe (False);
+                     every square found by propagation is added to it
+    @return the simplified constraints over the squares that are still
+            unassigned, or None if the constraints contradict each other
+    """
+    while True:
+        # Removes the assigned squares from every constraint
+        simplified = {}
+        for squares, mines in constraints:
+            mines -= sum(assigned[square] for square in squares if square in assigned)
+            squares = frozenset(square for square in squares if square not in assigned)
+            if not 0 <= mines <= len(squares) or simplified.get(squares, mines) != mines:
+                return None
+            if squares:
+                simplified[squares] = mines
+
+        # A constraint with no mines or no safe squares left decides its squares
+        progress = False
+        for squares, mines in simplified.items():
+            if mines == 0 or mines == len(squares):
+                for square in squares:
+                    if assigned.setdefault(square, mines > 0) != (mines > 0):
+                        return None
+                progress = True
+        constraints = set(simplified.items())
+        if progress:
+            continue
+
+        # If the squares of a are a subset of b's, b - a has b's mines - a's mines
+        derived = {(b - a, simplified[b] - simplified[a])
+                   for a in simplified for b in simplified if a < b}
+        if derived <= constraints:
+            return constraints
+        constraints |= derived
+
+
+def classify_all(state: List[List[int]], squares: List[Square]) -> Dict[Square, str]:
+    """
+    Solves several unknown squares of the inner 3x3 grid of a 5x5 minesweeper
+    state. The constraints are built and propagated once for all of them
+
+    @param state: a 5x5 minesweeper state
+    @param squares: the squares to solve
+    @return a dictionary from each square to its solution (see classify)
+    """
+    if isinstance(state, PackedState):
+        state = state.to_list()
+    check_state(state)
+    constraints = get_constraints(state)
+    assigned = {}
+    if constraints is not None:
+        constraints = propagate(constraints, assigned)
+    if constraints is None:
+        return {square: verdict(True, True) for square in squares}
+
+    solutions = {}
+    decided = {}  # Square -> (can be a mine, can be safe) for the groups decided so far
+    for square in squares:
+        if square in assigned:
+            solutions[square] = verdict(assigned[square], not assigned[square])
+        elif not any(square in members for members, _ in constraints):
+            solutions[square] = verdict(False, False)
+        else:
+            if square not in decided:
+                decided.update(_decide_group(constraints, square))
+            can_be_mine, can_be_safe = decided[square]
+            if can_be_mine != can_be_safe:
+                solutions[square] = verdict(can_be_mine, can_be_safe)
+            else:
+                # Both possible: unknown. Neither possible: the constraints contradict
+                solutions[square] = verdict(not can_be_mine, not can_be_mine)
+    return solutions
+
+
+def _decide_group(constraints: Set[Constraint], square: Square) -> Dict[Square, Tuple[bool, bool]]:
+    """
+    Decides whether the squares connected to an undecided square can be mines
+    and whether they can be safe. Only the constraints connected to the
+    square can decide it
+
+    @param constraints: the propagated constraints
+    @param square: a square that is in at least one constraint
+    @return a dictionary from each square of the group to whether some layout
+            has a mine in it and whether some layout has no mine in it
+    """
+    connected = {square}
+    group = set()
+    while True:
+        new = {constraint for constraint in constraints - group if constraint[0] & connected}
+        if not new:
+            break
+        group |= new
+        for members, _ in new:
+            connected |= members
+
+    total, mine_counts = count_group(list(group))
+    return {member: (mine_counts[member] > 0, mine_counts[member] < total)
+            for member in connected}
+
+
+def classify(state: List[List[int]]) -> str:
+    """
+    Solves the middle square of a 5x5 minesweeper state
+
+    @param state: a 5x5 minesweeper state
+    @return 'mine' or 'safe' if every mine layout that satisfies the revealed
+            squares agrees on the middle square, 'unknown' if they do not and
+            "schrodinger's mine" if no layout satisfies the revealed squares
+            around it
+    """
+    return classify_all(state, [MIDDLE])[MIDDLE]
@@ -12,7 +12,15 @@ Reid Moffat after submission
         Reid Moffat
 """
 
-from state import MinesweeperState
+from argparse import ArgumentParser, FileType
+from contextlib import nullcontext
+from collections import deque
+from itertools import chain, islice
+import json
+import sys
+from typing import Iterator, List
+from instrument import Profiler
+from state import ENGINES, MinesweeperState, check_state, solve_many
 from predefined_states import state_list
 from re import match, sub
 
@@ -105,4 +113,202 @@ def make_mine_state():
     new_state.test_state()
 
 
-main()
+def _parse_record(line: str) -> dict:
+    """
+    Parses one line of a board file. A line is either JSON (a 5x5 list, or an
+    object with a 'state' list and an optional 'id') or 25 integers separated
+    by spaces or commas in row order. The board itself is not checked, so the
+    id is kept if it is invalid; an exception is raised if the line cannot be
+    parsed
+
+    @param line: a line of the input file
+    @return a dictionary with the 'state' and, if one was given, the 'id'
+    """
+    line = line.strip()
+    if line[:1] in ['[', '{']:
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            raise Exception(f"error: invalid JSON ({error})") from error
+        if not isinstance(record, dict):
+            return {'state': record}
+        return {key: record[key] for key in ['state', 'id'] if key in record}
+
+    try:
+        squares = [int(square) for square in sub(r'[\s,]+', ' ', line).split()]
+    except ValueError as error:
+        raise Exception("error: squares must be integers") from error
+    if len(squares) != 25:
+        raise Exception("error: a state must have 25 squares")
+    return {'state': [squares[i * 5:i * 5 + 5] for i in range(5)]}
+
+
+def _read_batches(lines, batch_size: int, validate: bool) -> Iterator[List[dict]]:
+    """
+    Reads the records of a stream of lines one batch at a time. Lines that
+    cannot be parsed, boards that are invalid and, when validating, boards
+    that match no mine layout get an 'error' instead of being solved
+
+    @param lines: an iterable of lines (see _parse_record); blank lines are skipped
+    @param batch_size: number of lines in each batch
+    @param validate: True to check the boards with vectorized.validate_batch
+    @return an iterator over lists of records, each with the 'line' number,
+            the 'id' if one was given, and the 'state' or an 'error'
+    """
+    numbered = ((n, line) for n, line in enumerate(lines, start=1) if line.strip())
+    while True:
+        batch = list(islice(numbered, batch_size))
+        if not batch:
+            return
+
+        records = []
+        for line_num, line in batch:
+            record = {}
+            try:
+                record = _parse_record(line)
+                check_state(record.get('state'))
+            except Exception as error:  # pylint: disable=broad-except
+                record['error'] = str(error)  # Keeps the id if the JSON was read
+            record['line'] = line_num
+            records.append(record)
+
+        valid = [record for record in records if 'error' not in record]
+        if validate and valid:
+            # Imported here so numpy is only required when boards are validated
+            from vectorized import error_message, validate_batch  # pylint: disable=import-outside-toplevel
+            errors = validate_batch([record['state'] for record in valid])
+            for record, error in zip(valid, errors):
+                if error:
+                    record['error'] = error_message(error)
+        yield records
+
+
+def solve_stream(lines, output, engine='direct', batch_size=1024,
+                 flush_every=1, text_output=False, workers=1, cache_path=None,
+                 validate=False):
+    """
+    Solves every board in a stream of lines and writes one result per board,
+    in the same order. Boards are read and solved one batch at a time, so the
+    memory used does not depend on the size of the input. With several
+    workers, one pool of worker processes solves the whole stream (see
+    parallel.solve_parallel)
+
+    @param lines: an iterable of lines (see _parse_record); blank lines are skipped
+    @param output: a writable text file
+    @param engine: the engine used to solve each board (see state.solve_many)
+    @param batch_size: number of boards solved at once
+    @param flush_every: the output is flushed after this many batches
+    @param text_output: True to write only the solution (or error) on each line,
+                        False to write a JSON object per line
+    @param workers: number of worker processes (1 solves in this process)
+    @param cache_path: path of a persistent cache (see persistent_cache.py)
+                       that boards are looked up in and stored to (by every
+                       worker process, if there are several), or None to not
+                       use one
+    @param validate: True to reject boards that match no mine layout (see
+                     vectorized.validate_batch, requires numpy) instead of
+                     solving them
+    @return the number of boards read
+    """
+    if batch_size < 1 or flush_every < 1:
+        raise Exception("error: batch size and flush interval must be positive")
+
+    # Batches that have been read but not written yet, with the number of
+    # boards each one has to solve. Solutions come back in the same order as
+    # the boards, so the oldest batch is the first one to be complete
+    pending = deque()
+    unsolved = deque()  # Records waiting for a solution, in order
+
+    def board_batches():
+        # Boards of each batch, queueing the batch to be written once solved
+        for records in _read_batches(lines, batch_size, validate):
+            valid = [record for record in records if 'error' not in record]
+            pending.append((records, len(valid)))
+            unsolved.extend(valid)
+            yield [record['state'] for record in valid]
+
+    if workers > 1:
+        # Imported here so worker pools are only set up when requested
+        from parallel import solve_parallel  # pylint: disable=import-outside-toplevel
+        solutions = solve_parallel(chain.from_iterable(board_batches()), workers, engine,
+                                   cache_path=cache_path)
+    elif cache_path:
+        # Imported here so SQLite is only loaded when a cache is requested
+        from persistent_cache import PersistentCache  # pylint: disable=import-outside-toplevel
+        persistent = PersistentCache(cache_path, solver=lambda board: solve_many([board], engine)[0])
+        solutions = ([persistent.get(board) for board in boards] for boards in board_batches())
+        solutions = chain.from_iterable(solutions)
+    else:
+        solutions = chain.from_iterable(solve_many(boards, engine) for boards in board_batches())
+
+    count = batches = solved = 0
+    for solution in chain(solutions, [None]):  # None writes the batches left at the end
+        if solution is not None:
+            unsolved.popleft()['solution'] = solution
+            solved += 1
+        while pending and (pending[0][1] <= solved or solution is None):
+            records, boards = pending.popleft()
+            solved -= boards
+            for record in records:
+                if text_output:
+                    output.write(record.get('solution', record.get('error')) + '\n')
+                else:
+                    result = {key: record[key] for key in ['line', 'id', 'solution', 'error']
+                              if key in record}
+                    output.write(json.dumps(result) + '\n')
+            count += len(records)
+            batches += 1
+            if batches % flush_every == 0:
+                output.flush()
+
+    output.flush()
+    return count
+
+
+def cli(argv):
+    """
+    Runs the non-interactive commands. Currently only 'solve', which reads
+    boards from a file (or stdin) and writes their solutions to a file (or
+    stdout) without any prompts
+
+    @param argv: the command line arguments (without the program name)
+    """
+    parser = ArgumentParser(prog="run.py", description="Minesweeper state solver")
+    commands = parser.add_subparsers(dest='command', required=True)
+    solve = commands.add_parser('solve', help="solve boards from a file without prompts")
+    solve.add_argument('--input', type=FileType('r'), default=sys.stdin,
+                       help="JSONL or text file with one board per line (default: stdin)")
+    solve.add_argument('--output', type=FileType('w'), default=sys.stdout,
+                       help="file the results are written to (default: stdout)")
+    solve.add_argument('--engine', default='direct', choices=ENGINES + ['vectorized'])
+    solve.add_argument('--batch-size', type=int, default=1024,
+                       help="number of boards solved at once")
+    solve.add_argument('--flush-every', type=int, default=1,
+                       help="number of batches between output flushes")
+    solve.add_argument('--workers', type=int, default=1,
+                       help="number of worker processes")
+    solve.add_argument('--cache', metavar='PATH',
+                       help="SQLite file used to reuse solutions between runs "
+                            "(shared by every worker process)")
+    solve.add_argument('--text', action='store_true',
+                       help="write only the solution on each line instead of JSON")
+    solve.add_argument('--validate', action='store_true',
+                       help="reject boards that match no mine layout instead of solving them")
+    solve.add_argument('--profile', metavar='PATH',
+                       help="write per phase timing and count histograms to this JSON file "
+                            "(boards solved by worker processes are not recorded)")
+    args = parser.parse_args(argv)
+
+    profiler = Profiler() if args.profile else nullcontext()
+    with args.input, args.output, profiler:
+        solve_stream(args.input, args.output, args.engine, args.batch_size,
+                     args.flush_every, args.text, args.workers, args.cache, args.validate)
+    if args.profile:
+        profiler.export(args.profile)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        cli(sys.argv[1:])
+    else:
+        main()
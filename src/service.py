@@ -0,0 +1,259 @@
+"""
+Asyncio solving service for 5x5 minesweeper states
+
+Serves solutions over a local TCP port or Unix socket using one JSON object
+per line:
+    request:  {"id": 1, "state": [[...], ...]}   or   {"id": 2, "metrics": true}
+    response: {"id": 1, "solution": "mine"}      or   {"id": 1, "error": "..."}
+
+Requests from every connection go into one bounded queue. A batcher takes up
+to batch_size requests at a time (waiting at most max_delay seconds for a
+batch to fill), solves them with state.solve_many in an executor so the event
+loop is never blocked, and answers each request. At most max_queue requests
+are read but not answered at once: when that many are waiting, connections
+stop being read until one is answered (backpressure)
+
+Run 'python src/service.py --help' for options
+"""
+
+from argparse import ArgumentParser
+import asyncio
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+import json
+from time import perf_counter
+from typing import List
+from instrument import summarize
+from state import ENGINES, check_state, solve_many
+
+SAMPLES = 10000  # Latencies and batch sizes kept for the metrics
+
+
+class SolveService:
+    """
+    Micro-batching solver service
+    """
+
+    def __init__(self, engine: str = 'direct', batch_size: int = 256,
+                 max_delay: float = 0.002, max_queue: int = 4096,
+                 executor: Executor = None):
+        """
+        @param engine: the engine used to solve each board (see state.solve_many)
+        @param batch_size: maximum number of boards solved at once
+        @param max_delay: seconds the batcher waits for a batch to fill
+        @param max_queue: maximum number of waiting requests
+        @param executor: executor the batches are solved in (a single thread by
+                         default; a ProcessPoolExecutor uses more cores)
+        """
+        if engine not in ENGINES + ['vectorized']:
+            raise Exception(f"error: engine must be one of {', '.join(ENGINES + ['vectorized'])}")
+        self.engine = engine
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.max_queue = max_queue
+        self.queue = None  # Created by start, inside the running event loop
+        self.__slots = None  # Limits the requests read but not answered yet
+        self.__owns_executor = executor is None  # Only shut down executors made here
+        self.executor = executor or ThreadPoolExecutor(1)
+        # Seconds from queueing to answer and batch sizes, the most recent
+        # SAMPLES of each since the last reset
+        self.latencies = deque(maxlen=SAMPLES)
+        self.batch_sizes = deque(maxlen=SAMPLES)
+        self.solved = 0
+        self.__batcher = None
+        self.__server = None
+
+    async def solve(self, board: List[List[int]]) -> str:
+        """
+        Queues a board, waiting if the queue is full, and returns its solution
+
+        @param board: a 5x5 minesweeper state
+        @return the english representation of the solution
+        """
+        check_state(board)
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((board, future, perf_counter()))
+        return await future
+
+    async def __run_batches(self):
+        """
+        Takes batches of requests from the queue and solves them until cancelled
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            boards = [board for board, _, _ in batch]
+            try:
+                solutions = await loop.run_in_executor(self.executor, solve_many,
+                                                       boards, self.engine)
+            except Exception as error:  # pylint: disable=broad-except
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+
+            now = perf_counter()
+            for (_, future, queued), solution in zip(batch, solutions):
+                if not future.done():
+                    future.set_result(solution)
+                self.latencies.append(now - queued)
+            self.batch_sizes.append(len(batch))
+            self.solved += len(batch)
+
+    def metrics(self, reset: bool = False) -> dict:
+        """
+        Returns the service metrics
+
+        @param reset: True to clear the latency and batch size samples
+        @return a dictionary with the queue depth, number of solved boards,
+                latency summary (microseconds) and average batch size of the
+                most recent SAMPLES batches
+        """
+        result = {'queue_depth': self.queue.qsize() if self.queue else 0, 'solved': self.solved,
+                  'batches': len(self.batch_sizes)}
+        if self.latencies:
+            result['latency'] = summarize(self.latencies)
+            result['mean_batch_size'] = sum(self.batch_sizes) / len(self.batch_sizes)
+        if reset:
+            self.latencies.clear()
+            self.batch_sizes.clear()
+        return result
+
+    async def __handle_request(self, line: bytes, writer: asyncio.StreamWriter,
+                               lock: asyncio.Lock):
+        """
+        Answers one request line
+
+        @param line: the request
+        @param writer: stream the response is written to
+        @param lock: lock keeping responses on the same connection whole
+        """
+        response = {}
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise Exception("error: a request must be a JSON object")
+            if 'id' in request:
+                response['id'] = request['id']
+            if request.get('metrics'):
+                response['metrics'] = self.metrics(bool(request.get('reset')))
+            else:
+                response['solution'] = await self.solve(request.get('state'))
+        except Exception as error:  # pylint: disable=broad-except
+            response['error'] = str(error)
+        async with lock:
+            writer.write(json.dumps(response).encode() + b'\n')
+            await writer.drain()
+
+    async def __handle_connection(self, reader: asyncio.StreamReader,
+                                  writer: asyncio.StreamWriter):
+        """
+        Reads requests from a connection until it is closed. Each request is
+        answered as soon as it is solved, so responses can be out of order;
+        use the id to match them
+
+        @param reader: the connection's input stream
+        @param writer: the connection's output stream
+        """
+        lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                # Stops reading while too many requests are waiting (backpressure)
+                await self.__slots.acquire()
+                task = asyncio.create_task(self.__handle_request(line, writer, lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                task.add_done_callback(lambda _: self.__slots.release())
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8204, path: str = None):
+        """
+        Starts the batcher and the server. solve can be called directly (without
+        a connection) once the service is started
+
+        @param host: address to listen on (localhost by default)
+        @param port: TCP port to listen on (0 picks a free port)
+        @param path: Unix socket path to listen on instead of a TCP port
+        @return the asyncio server
+        """
+        self.queue = asyncio.Queue(self.max_queue)
+        self.__slots = asyncio.Semaphore(self.max_queue)
+        self.__batcher = asyncio.create_task(self.__run_batches())
+        if path:
+            self.__server = await asyncio.start_unix_server(self.__handle_connection, path)
+        else:
+            self.__server = await asyncio.start_server(self.__handle_connection, host, port)
+        return self.__server
+
+    async def stop(self):
+        """
+        Stops the server and the batcher
+        """
+        if self.__server is not None:
+            self.__server.close()
+            await self.__server.wait_closed()
+        if self.__batcher is not None:
+            self.__batcher.cancel()
+            try:
+                await self.__batcher
+            except asyncio.CancelledError:
+                pass
+        if self.__owns_executor:
+            self.executor.shutdown(wait=False)
+
+
+async def serve(args):
+    """
+    Runs the service until it is interrupted
+
+    @param args: the parsed command line arguments
+    """
+    service = SolveService(args.engine, args.batch_size, args.max_delay / 1000, args.max_queue)
+    server = await service.start(args.host, args.port, args.unix)
+    print(f"Serving on {args.unix or server.sockets[0].getsockname()}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await service.stop()
+
+
+def main():
+    """
+    Starts the service from the command line
+    """
+    parser = ArgumentParser(description="Minesweeper solving service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8204)
+    parser.add_argument('--unix', metavar='PATH', help="listen on a Unix socket instead")
+    parser.add_argument('--engine', default='direct', choices=ENGINES + ['vectorized'])
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--max-delay', type=float, default=2, help="milliseconds")
+    parser.add_argument('--max-queue', type=int, default=4096)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -4,20 +4,169 @@ Minesweeper state class
 Represents and solves a 5x5 minesweeper state
 """
 
-from typing import List
-from lib204 import Encoding
-from nnf import Var
-from nnf.operators import iff
+from typing import Dict, Iterable, List, Tuple
+import cache
+import direct
+import instrument
+from packed import PackedState, check_row, check_row_number, check_square
+import probability
+import propagation
+from table import default_table
+
+# Var objects are immutable and only identified by their name, so the
+# variables (and their negations) for the 5x5 grid are created once and
+# shared by every state instead of being rebuilt for each board. They are
+# built by _load_encoding_parts the first time an encoding is needed, so
+# importing this module (or using an engine without an encoding) does not
+# load nnf
+_GRID_VARS = None
+_NEGATED_VARS = None
+_TRUTH_ENCODINGS = None
+
+
+def _build_truth_encodings():
+    """
+    Builds the constraints that determine the state of the middle square.
+    These are the same for every board, so they are only built once
+
+    @return a list of the three middle square constraints
+    """
+    from nnf.operators import iff  # pylint: disable=import-outside-toplevel
+
+    x, y = _GRID_VARS['x'], _GRID_VARS['y']
+    m, s, u = _GRID_VARS['m'], _GRID_VARS['s'], _GRID_VARS['u']
+
+    return [
+        # If there are any adjacent squares with a True y condition, the middle
+        # square is a mine. See the boolean condition guide for an explanation
+        iff((y[1][1] | y[1][2] | y[1][3] | y[2][1] | y[2][3] |
+             y[3][1] | y[3][2] | y[3][3]), m[2][2]),
+        # If there are any adjacent squares with a True x condition, the middle
+        # square is safe. See the boolean condition guide for an explanation
+        iff((x[1][1] | x[1][2] | x[1][3] | x[2][1] | x[2][3] |
+             x[3][1] | x[3][2] | x[3][3]), s[2][2]),
+        # If the middle square isn't a mine or safe, it is unknown
+        iff(~m[2][2] & ~s[2][2], u[2][2])
+    ]
+
+
+def _load_encoding_parts():
+    """
+    Builds the shared grid variables and middle square constraints, if they
+    have not been built yet
+    """
+    global _GRID_VARS, _NEGATED_VARS, _TRUTH_ENCODINGS  # pylint: disable=global-statement
+    if _GRID_VARS is not None:
+        return
+    from nnf import Var  # pylint: disable=import-outside-toplevel
+
+    _GRID_VARS = {prefix: [[Var(prefix + str(i) + str(j)) for j in range(5)]
+                           for i in range(5)]
+                  for prefix in ['x', 'y', 'm', 'u', 's']}
+    _NEGATED_VARS = {prefix: [[~var for var in row] for row in grid]
+                     for prefix, grid in _GRID_VARS.items()}
+    _TRUTH_ENCODINGS = _build_truth_encodings()
+
+
+# Squares of the inner 3x3 grid (the squares whose neighbours are all inside
+# the 5x5 grid) and, for each of them, its neighbours in the inner 3x3 grid
+_INNER_NEIGHBOURS = {(i, j): [(i + di, j + dj) for di, dj in direct.ADJACENT
+                              if 1 <= i + di <= 3 and 1 <= j + dj <= 3]
+                     for i in range(1, 4) for j in range(1, 4)}
+
+# Engines that can be used to solve a state:
+# -sat: builds the propositional encoding and solves it with a SAT solver
+# -direct: computes the x and y conditions directly (see direct.py)
+# -cached: memoizes the SAT solution in a symmetry-aware cache (see cache.py)
+# -template: conditions the precompiled middle square constraints on each
+#  board's facts (see template.py)
+# -table: looks up the x and y conditions in a precomputed table (see table.py)
+# -propagation: reasons over the mine counts of the revealed squares, counting
+#  the mine layouts that are left (see propagation.py). It can decide boards
+#  the x and y conditions cannot, so its results are not always the same
+ENGINES = ['sat', 'direct', 'cached', 'template', 'table', 'propagation']
+
+
+def check_state(new_state: List):
+    """
+    Raises an exception if a state is not 5 rows that pass check_row
+
+    @param new_state: a 5x5 minesweeper state
+    """
+    if isinstance(new_state, PackedState):
+        return  # Packed states can only hold valid squares
+    if not isinstance(new_state, list) or len(new_state) != 5:
+        raise Exception("error: a state must have 5 rows")
+    for row in new_state:
+        check_row(row)
+
+
+def solve_many(boards: Iterable[List[List[int]]], engine: str = 'sat') -> List[str]:
+    """
+    Solves a collection of 5x5 boards without printing or prompting
+
+    @param boards: an iterable of 5x5 minesweeper states
+    @param engine: the engine used to solve each board (see ENGINES), or
+                   'vectorized' to solve every board at once with numpy
+    @return a list with the solution of each board (see get_solution), in the
+            same order as the boards were given
+    """
+    if instrument.active is not None and engine != 'vectorized':
+        # Profiled boards go through MinesweeperState, which records them
+        return [MinesweeperState(board, engine=engine).solve() for board in boards]
+    if engine == 'vectorized':
+        # Imported here so numpy is only required for the vectorized engine
+        import vectorized  # pylint: disable=import-outside-toplevel
+        return vectorized.solve_batch(boards)
+    if engine == 'direct':
+        return [direct.classify(board) for board in boards]
+    if engine == 'cached':
+        return [verdict_cache.get(board) for board in boards]
+    if engine == 'template':
+        from template import default_template  # pylint: disable=import-outside-toplevel
+        template = default_template()
+        return [template.classify(board) for board in boards]
+    if engine == 'table':
+        table = default_table()
+        return [table.classify(board) for board in boards]
+    if engine == 'propagation':
+        return [propagation.classify(board) for board in boards]
+    return [MinesweeperState(board, engine=engine).solve() for board in boards]
+
+
+def _solve_sat(board: List[List[int]]) -> str:
+    """
+    Solves a board with the SAT engine (used to fill the verdict cache)
+
+    @param board: a 5x5 minesweeper state
+    @return the english representation of the solution
+    """
+    return MinesweeperState(board).solve()
+
+
+# Cache used by the 'cached' engine
+verdict_cache = cache.VerdictCache(solver=_solve_sat)
 
 
 class MinesweeperState:
 
-    def __init__(self, new_state, expected_result=None, num=-1):
+    def __init__(self, new_state, expected_result=None, num=-1, engine='sat',
+                 incremental=False):
+
+        if engine not in ENGINES:
+            raise Exception(f"error: engine must be one of {', '.join(ENGINES)}")
 
-        self.state = new_state[:]  # 5x5 minesweeper state
+        # 5x5 minesweeper state (packed states are unpacked for the encoding)
+        self.state = new_state.to_list() if isinstance(new_state, PackedState) else new_state[:]
         self.solution = None  # Model solution solved with an encoding
         self.expected = expected_result  # Only used with predefined states
         self.state_num = num  # Number for predefined states (-1 for custom)
+        self.engine = engine  # Engine used to solve this state (see ENGINES)
+
+        # In incremental mode the encoding is only built once, and changing a
+        # square patches the constraints that depend on it instead
+        self.incremental = incremental
+        self.__fact_index = {}  # (condition, i, j) -> index of its unit constraint
 
         '''
         Boolean condition guide:
@@ -88,7 +237,10 @@ class MinesweeperState:
         # safe boolean condition for each square
         self.s = [[] for i in range(5)]
 
-        self.E = Encoding()  # Encoding initialization used to solve this model
+        # Encoding used to solve this model (only the sat engine has one)
+        self.E = None
+        if engine == 'sat':
+            self.E = self.__new_encoding()
 
     def set_square(self, i: int, j: int, new_value: int):
         """
@@ -99,13 +251,10 @@ class MinesweeperState:
         @param j: row number
         @param new_value: a new value for the square
         """
-        if not isinstance(i, int) or not 0 <= i <= 4:
-            raise Exception("error: column number must be an integer in the range [0, 4]")
-        if not isinstance(j, int) or not 0 <= j <= 4:
-            raise Exception("error: row number must be an integer in the range [0, 4]")
-        if not isinstance(new_value, int) or not -2 <= new_value <= 8:
-            raise Exception("error: new value must be an integer in the range [-2, 8]")
+        check_square(i, j, new_value)
         self.state[i][j] = new_value
+        if self.incremental and self.__fact_index:
+            self.__update_square(i, j)
 
     def set_row(self, i: int, new_row: List):
         """
@@ -115,12 +264,158 @@ class MinesweeperState:
         @param i: row number
         @param new_row: the new row of squares
         """
-        if not isinstance(i, int) or not 0 <= i <= 4:
-            raise Exception("error: column number must be an integer in the range [0, 4]")
-        if not isinstance(new_row, list) or len(new_row) != 5 \
-                or not all([True if isinstance(square, int) and -2 <= square <= 8 else False for square in new_row]):
-            raise Exception("error: new row must have 5 integers in the range [-2, 8]")
+        check_row_number(i)
+        check_row(new_row)
         self.state[i] = new_row[:]
+        if self.incremental and self.__fact_index:
+            for j in range(5):
+                self.__update_square(i, j)
+
+    def solve(self) -> str:
+        """
+        Solves this minesweeper state without printing anything. The encoding
+        is only solved once; the model returned by the SAT solver is also used
+        to determine satisfiability (no model means it is not satisfiable)
+
+        @return the english representation of the solution (see get_solution)
+        """
+        with instrument.board():
+            if self.engine != 'sat':
+                with instrument.phase('engine'):
+                    return self.__solve_without_encoding()
+
+            # Incremental states keep their (patched) encoding between solves
+            if not (self.incremental and self.__fact_index):
+                self.__create_encoding()  # Adds the constraints and state variables
+            if instrument.active is not None:
+                instrument.count('constraints', len(self.E.constraints))
+                instrument.count('variables', len(self.E.vars()))
+            self.solution = self.E.solve()  # Solves the encoding
+            with instrument.phase('decode'):
+                return self.get_solution()
+
+    def __solve_without_encoding(self) -> str:
+        """
+        Solves this minesweeper state with an engine that does not build an
+        encoding
+
+        @return the english representation of the solution (see get_solution)
+        """
+        if self.engine == 'direct':
+            # The direct evaluator gives the same model without an encoding
+            self.solution = direct.evaluate(self.state)
+            return self.get_solution()
+        if self.engine == 'template':
+            # Imported here so nnf is only loaded for the engines that use it
+            from template import default_template  # pylint: disable=import-outside-toplevel
+            self.solution = default_template().solve(self.state)
+            return self.get_solution()
+
+        # Only the middle square's conditions are known for the other engines
+        if self.engine == 'cached':
+            result = verdict_cache.get(self.state)
+        elif self.engine == 'table':
+            result = default_table().classify(self.state)
+        else:
+            result = propagation.classify(self.state)
+        mine = result in ["mine", "schrodinger's mine"]
+        safe = result in ["safe", "schrodinger's mine"]
+        self.solution = {'m22': mine, 's22': safe, 'u22': not mine and not safe}
+        return result
+
+    def solve_all(self) -> Dict[Tuple[int, int], str]:
+        """
+        Solves every unknown square of the inner 3x3 grid at once (the middle
+        square is always solved, like in solve). Only the squares of the inner
+        3x3 grid have x and y conditions, so each square is decided by its
+        neighbours in the inner 3x3 grid; for the middle square these are the
+        inner ring, which gives the same result as solve. The sat engine builds
+        one encoding with the x and y facts shared by every square and solves
+        it once, the propagation engine propagates the constraints once (see
+        propagation.classify_all) and every other engine computes the x and y
+        conditions once (they give the same results as the sat engine)
+
+        @return a dictionary from the (row, column) of each solved square to
+                its solution (see get_solution)
+        """
+        squares = [square for square in _INNER_NEIGHBOURS
+                   if square == (2, 2) or self.state[square[0]][square[1]] == -1]
+        if self.engine == 'propagation':
+            return propagation.classify_all(self.state, squares)
+        with instrument.board():
+            if self.engine == 'sat':
+                return self.__solve_all_encoding(squares)
+
+            with instrument.phase('engine'):
+                direct.check_state(self.state)
+                conditions = {square: direct.get_conditions(self.state, *square)
+                              for square in _INNER_NEIGHBOURS}
+                solutions = {}
+                for square in squares:
+                    neighbours = _INNER_NEIGHBOURS[square]
+                    solutions[square] = direct.verdict(any(conditions[n][1] for n in neighbours),
+                                                       any(conditions[n][0] for n in neighbours))
+                return solutions
+
+    def __solve_all_encoding(self, squares: List[Tuple[int, int]]) -> Dict[Tuple[int, int], str]:
+        """
+        Builds one encoding for several squares of the inner 3x3 grid and
+        solves it. Unlike the encoding built by solve, it has no unit facts
+        for the m, u and s conditions of the solved squares, since those are
+        the conditions being solved for
+
+        @param squares: the squares to solve
+        @return a dictionary from each square to its solution
+        """
+        from nnf import Or  # pylint: disable=import-outside-toplevel
+        from nnf.operators import iff  # pylint: disable=import-outside-toplevel
+
+        E = self.__new_encoding()
+        direct.check_state(self.state)
+        x, y = _GRID_VARS['x'], _GRID_VARS['y']
+        with instrument.phase('initial_state'):
+            # The x and y facts of the inner 3x3 grid, shared by every square
+            for i, j in _INNER_NEIGHBOURS:
+                E.add_constraint(x[i][j] if self.__is_x(i, j) else _NEGATED_VARS['x'][i][j])
+                E.add_constraint(y[i][j] if self.__is_y(i, j) else _NEGATED_VARS['y'][i][j])
+        with instrument.phase('truth_encodings'):
+            for i, j in squares:
+                neighbours = _INNER_NEIGHBOURS[(i, j)]
+                m, s, u = _GRID_VARS['m'][i][j], _GRID_VARS['s'][i][j], _GRID_VARS['u'][i][j]
+                # The same constraints as _build_truth_encodings, for this square
+                E.add_constraint(iff(Or(y[a][b] for a, b in neighbours), m))
+                E.add_constraint(iff(Or(x[a][b] for a, b in neighbours), s))
+                E.add_constraint(iff(~m & ~s, u))
+        if instrument.active is not None:
+            instrument.count('constraints', len(E.constraints))
+            instrument.count('variables', len(E.vars()))
+
+        model = E.solve()
+        with instrument.phase('decode'):
+            if model is None:
+                return {square: "error: model is not satisfiable" for square in squares}
+            return {(i, j): direct.verdict(model[f"m{i}{j}"], model[f"s{i}{j}"])
+                    for i, j in squares}
+
+    def is_satisfiable(self) -> bool:
+        """
+        Returns if this state's encoding was satisfiable. Must be called after
+        the state has been solved
+
+        @return True if the last solve found a model, False otherwise
+        """
+        return self.solution is not None
+
+    def mine_probabilities(self) -> dict:
+        """
+        Computes the probability that each unknown square of this state is a
+        mine (see probability.py). Squares on the edge of the 5x5 grid may have
+        mines outside of it, so their numbers are not used as constraints
+
+        @return a dictionary from the (row, column) of each unknown square to its
+                mine probability
+        """
+        return probability.mine_probabilities(self.state, window=True)
 
     def test_state(self):
         """
@@ -132,16 +427,15 @@ class MinesweeperState:
             -A prompt to print all of the state variables
         """
 
-        self.__create_encoding()  # Adds the constraints and state variables
-        self.solution = self.E.solve()  # Solves the encoding
+        result = self.solve()
 
         self.print_state()
 
         # Prints if the encoding is satisfiable, the expected result and model result
-        print("SATISFIABLE: " + str(self.E.is_satisfiable()) + "\n")
+        print("SATISFIABLE: " + str(self.is_satisfiable()) + "\n")
         if self.expected:
             print("Expected result:", self.expected)
-        print(f"Model result: {self.get_solution()}\n")
+        print(f"Model result: {result}\n")
 
         if input("Would you like to see the full solution states ('y' to see)? ").strip().lower() == 'y':
             # Prints the solution
@@ -156,20 +450,40 @@ class MinesweeperState:
                     keym = "m" + num
                     keyx = "x" + num
                     keyy = "y" + num
-                    print(keyu, self.solution[keyu])
-                    print(keym, self.solution[keym])
-                    print(keyx, self.solution[keyx])
-                    print(keyy, self.solution[keyy])
+                    keys = [keyu, keym, keyx, keyy]
                     if i == 2 and j == 2:
-                        print("s22", self.solution["s22"])
+                        keys.append("s22")
+                    # Engines that skip the encoding may only solve some keys
+                    for key in keys:
+                        if key in self.solution:
+                            print(key, self.solution[key])
                     print()
 
+    @staticmethod
+    def __new_encoding():
+        """
+        Returns an empty encoding, loading nnf and the shared encoding parts
+        the first time
+
+        @return a new Encoding
+        """
+        # Imported here so nnf is only loaded for the engines that use it
+        from lib204 import Encoding  # pylint: disable=import-outside-toplevel
+        _load_encoding_parts()
+        return Encoding()
+
     def __create_encoding(self):
         """
-        Sets up the grid with the required encodings
+        Sets up the grid with the required encodings, replacing any encoding
+        built by a previous solve
         """
-        self.__set_initial_state()
-        self.__set_truth_encodings()
+        self.E = self.__new_encoding()
+        self.x, self.y, self.m, self.u, self.s = ([[] for i in range(5)] for _ in range(5))
+        self.__fact_index = {}
+        with instrument.phase('initial_state'):
+            self.__set_initial_state()
+        with instrument.phase('truth_encodings'):
+            self.__set_truth_encodings()
 
     def __set_initial_state(self):
         """
@@ -184,9 +498,9 @@ class MinesweeperState:
                 # mij, uij and sij. For example, m12 would be the condition that
                 # the square at coordinates (1, 2) is a bomb (coordinates start
                 # at (0, 0))
-                self.m[i].append(Var('m' + str(i) + str(j)))
-                self.u[i].append(Var('u' + str(i) + str(j)))
-                self.s[i].append(Var('s' + str(i) + str(j)))
+                self.m[i].append(_GRID_VARS['m'][i][j])
+                self.u[i].append(_GRID_VARS['u'][i][j])
+                self.s[i].append(_GRID_VARS['s'][i][j])
 
                 # Each square's state is checked and constraints are added
                 # The if conditional is used to ignore the center square since
@@ -200,9 +514,9 @@ class MinesweeperState:
                                         f'inclusive. Square [{i}][{j}] has a'
                                         f'value of {state}')
 
-                    self.E.add_constraint(self.m[i][j] if state == -2 else ~self.m[i][j])  # mine
-                    self.E.add_constraint(self.u[i][j] if state == -1 else ~self.u[i][j])  # unknown
-                    self.E.add_constraint(self.s[i][j] if state > -1 else ~self.s[i][j])  # revealed square
+                    self.__add_fact('m', i, j, state == -2)  # mine
+                    self.__add_fact('u', i, j, state == -1)  # unknown
+                    self.__add_fact('s', i, j, state > -1)  # revealed square
 
         # Initializing x and y cases for the center 3x3 grid
         for i in grid_range:
@@ -211,8 +525,8 @@ class MinesweeperState:
                     self.__set_x_truth(i, j)
                     self.__set_y_truth(i, j)
                 else:
-                    self.x[i].append(Var("x" + str(i) + str(j)))
-                    self.y[i].append(Var("y" + str(i) + str(j)))
+                    self.x[i].append(_GRID_VARS['x'][i][j])
+                    self.y[i].append(_GRID_VARS['y'][i][j])
 
     def __set_x_truth(self, i: int, j: int):
         """
@@ -222,6 +536,34 @@ class MinesweeperState:
         @param j: column number of the square
         """
 
+        # Instantiates a Var object for the x condition at the given coordinate and
+        # sets a constraint for it
+        self.x[i].append(_GRID_VARS['x'][i][j])
+        self.__add_fact('x', i, j, self.__is_x(i, j))
+
+    def __set_y_truth(self, i: int, j: int):
+        """
+        Sets the y truth values a given square in a grid
+
+        @param i: row number of the square
+        @param j: column number of the square
+        """
+
+        # Instantiates the y condition at the given coordinate and sets a constraint
+        # for it
+        self.y[i].append(_GRID_VARS['y'][i][j])
+        self.__add_fact('y', i, j, self.__is_y(i, j))
+
+    def __is_x(self, i: int, j: int) -> bool:
+        """
+        Returns if a given square is an x (its number is equal to the number of
+        adjacent mines)
+
+        @param i: row number of the square
+        @param j: column number of the square
+        @return the value of the x condition for the square
+        """
+
         # This constant list is used to quickly get the coordinates of adjacent squares
         coordinates = [[i - 1, j - 1], [i - 1, j], [i - 1, j + 1],
                        [i, j - 1], [i, j + 1],
@@ -235,20 +577,16 @@ class MinesweeperState:
             if self.state[adjacent_row][adjacent_col] == -2:
                 counter += 1
 
-        # Instantiates a Var object for the x condition at the given coordinate and
-        # sets a constraint for it
-        self.x[i].append(Var("x" + str(i) + str(j)))
-        if self.state[i][j] == counter:
-            self.E.add_constraint(self.x[i][j])
-        else:
-            self.E.add_constraint(~self.x[i][j])
+        return self.state[i][j] == counter
 
-    def __set_y_truth(self, i: int, j: int):
+    def __is_y(self, i: int, j: int) -> bool:
         """
-        Sets the y truth values a given square in a grid
+        Returns if a given square is a y (its number is equal to the number of
+        adjacent mines and unknown squares)
 
         @param i: row number of the square
         @param j: column number of the square
+        @return the value of the y condition for the square
         """
 
         # This constant list is used to quickly get the coordinates of adjacent squares
@@ -265,31 +603,55 @@ class MinesweeperState:
             if adjacent_square == -1 or adjacent_square == -2:
                 counter += 1
 
-        # Instantiates the y condition at the given coordinate and sets a constraint
-        # for it
-        self.y[i].append(Var("y" + str(i) + str(j)))
-        if self.state[i][j] == counter:
-            self.E.add_constraint(self.y[i][j])
-        else:
-            self.E.add_constraint(~self.y[i][j])
+        return self.state[i][j] == counter
+
+    def __add_fact(self, condition: str, i: int, j: int, value: bool):
+        """
+        Adds a unit constraint setting a condition of a square to a value and
+        remembers where it is so it can be patched in incremental mode
+
+        @param condition: the condition (x, y, m, u or s)
+        @param i: row number of the square
+        @param j: column number of the square
+        @param value: the value of the condition
+        """
+        self.__fact_index[(condition, i, j)] = len(self.E.constraints)
+        self.E.add_constraint(_GRID_VARS[condition][i][j] if value
+                              else _NEGATED_VARS[condition][i][j])
+
+    def __update_square(self, i: int, j: int):
+        """
+        Patches the constraints that depend on a square after it was changed:
+        its own m, u and s facts and the x and y facts of every square in the
+        inner 3x3 grid that is the square itself or adjacent to it
+
+        @param i: row number of the square
+        @param j: column number of the square
+        """
+        patches = []
+        state = self.state[i][j]
+        if not (i == 2 and j == 2):
+            patches += [('m', i, j, state == -2), ('u', i, j, state == -1),
+                        ('s', i, j, state > -1)]
+        for a in range(max(i - 1, 1), min(i + 1, 3) + 1):
+            for b in range(max(j - 1, 1), min(j + 1, 3) + 1):
+                patches += [('x', a, b, self.__is_x(a, b)),
+                            ('y', a, b, self.__is_y(a, b))]
+
+        for condition, a, b, value in patches:
+            self.E.replace_constraint(self.__fact_index[(condition, a, b)],
+                                      _GRID_VARS[condition][a][b] if value
+                                      else _NEGATED_VARS[condition][a][b])
 
     def __set_truth_encodings(self):
         """
         Sets the constraints required to determine the state of the middle square
         """
 
-        # If there are any adjacent squares with a True y condition, the middle square
-        # is a mine. See the boolean condition guide (top) for an explanation
-        self.E.add_constraint(iff((self.y[1][1] | self.y[1][2] | self.y[1][3] |
-                                   self.y[2][1] | self.y[2][3] | self.y[3][1] |
-                                   self.y[3][2] | self.y[3][3]), self.m[2][2]))
-        # If there are any adjacent squares with a True x condition, the middle square
-        # is safe. See the boolean condition guide (top) for an explanation
-        self.E.add_constraint(iff((self.x[1][1] | self.x[1][2] | self.x[1][3] |
-                                   self.x[2][1] | self.x[2][3] | self.x[3][1] |
-                                   self.x[3][2] | self.x[3][3]), self.s[2][2]))
-        # If the middle square isn't a mine or safe, it is unknown
-        self.E.add_constraint(iff(~self.m[2][2] & ~self.s[2][2], self.u[2][2]))
+        # The middle square constraints are identical for every board (see
+        # _build_truth_encodings), so the prebuilt constraints are reused
+        for constraint in _TRUTH_ENCODINGS:
+            self.E.add_constraint(constraint)
 
     def get_solution(self) -> str:
         """
@@ -304,6 +666,9 @@ class MinesweeperState:
                     (this should not happen, check constraints if you see this)
         """
 
+        if self.solution is None:
+            return "error: model is not satisfiable"
+
         try:
             if self.solution['m22'] and self.solution['s22']:
                 return "schrodinger's mine"
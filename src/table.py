@@ -0,0 +1,164 @@
+"""
+Precomputed verdict table for 5x5 minesweeper states
+
+A 5x5 board has 11^24 possible inputs, far too many to enumerate. The
+solution is an or over the inner ring though (mine if any square is a y, safe
+if any square is an x), and each square's x and y conditions only depend on
+its own value and on which of its 8 neighbours are mines, unknown or
+revealed: the numbers on revealed neighbours are irrelevant. Every one of
+these 11 * 3^8 = 72,171 neighbourhoods is enumerated offline into a table of
+x/y bits, so solving a board is 8 table lookups
+
+The table is stored as a small binary file that is memory-mapped when loaded,
+so loading it is nearly free and every process shares the same pages. Build
+it with 'python src/table.py build'
+"""
+
+from argparse import ArgumentParser
+import mmap
+import os
+import tempfile
+from typing import List
+from direct import ADJACENT, INNER_RING, check_state, verdict
+from packed import PackedState
+
+MAGIC = b'MSVT\x01'  # File signature and format version
+NEIGHBOURHOODS = 3 ** 8  # Mine/unknown/revealed for each of the 8 neighbours
+TABLE_SIZE = 11 * NEIGHBOURHOODS  # Times the 11 values of the square itself
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'verdict_table.bin')
+
+# Class of each square value used in neighbourhood codes
+_CLASSES = {value: 0 for value in range(0, 9)}
+_CLASSES[-1] = 1  # Unknown
+_CLASSES[-2] = 2  # Mine
+
+# For each inner ring square, its position and the positions of its 8
+# neighbours in a flattened (row * 5 + column) board
+_RING_NEIGHBOURS = [(i * 5 + j, [(i + di) * 5 + j + dj for di, dj in ADJACENT])
+                    for i, j in INNER_RING]
+
+
+def build_table() -> bytes:
+    """
+    Enumerates the x and y conditions of every neighbourhood. The entry at
+    (value + 2) * 3^8 + neighbourhood code has bit 0 set if the square is an
+    x and bit 1 set if it is a y, where the neighbourhood code has one base 3
+    digit per neighbour (0 revealed, 1 unknown, 2 mine) in the order of
+    direct.ADJACENT, the first neighbour being the least significant digit
+
+    @return the table
+    """
+    table = bytearray(TABLE_SIZE)
+    for value in range(-2, 9):
+        for code in range(NEIGHBOURHOODS):
+            mines = covered = 0
+            rest = code
+            for _ in range(8):
+                rest, digit = divmod(rest, 3)
+                mines += digit == 2
+                covered += digit > 0
+            table[(value + 2) * NEIGHBOURHOODS + code] = (value == mines) | (value == covered) << 1
+    return bytes(table)
+
+
+def write_table(path: str = DEFAULT_PATH):
+    """
+    Builds the table and writes it to a file
+
+    @param path: path of the table file
+    """
+    # Each writer uses its own temporary file in the same directory, so
+    # processes building the table at the same time do not replace each
+    # other's file, and readers never see a partially written one
+    descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                             prefix=os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(MAGIC + build_table())
+        os.chmod(temporary, 0o644)  # mkstemp only lets the owner read the file
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+class VerdictTable:
+    """
+    A memory-mapped verdict table
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        """
+        @param path: path of the table file (built if it does not exist)
+        """
+        if not os.path.exists(path):
+            write_table(path)
+        with open(path, 'rb') as file:
+            self.table = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.table) != len(MAGIC) + TABLE_SIZE or self.table[:len(MAGIC)] != MAGIC:
+            self.table.close()
+            raise Exception(f"error: {path} is not a verdict table, rebuild it with "
+                            "'python src/table.py build'")
+
+    def classify(self, state: List[List[int]]) -> str:
+        """
+        Solves the middle square of a 5x5 minesweeper state
+
+        @param state: a 5x5 minesweeper state
+        @return the same result as MinesweeperState.get_solution for this state
+        """
+        if isinstance(state, PackedState):
+            state = state.to_list()
+        check_state(state)
+        squares = [square for row in state for square in row]
+        classes = [_CLASSES.get(square, 0) for square in squares]
+        mine = safe = False
+        offset = len(MAGIC)
+        for position, neighbours in _RING_NEIGHBOURS:
+            code = 0
+            for neighbour in reversed(neighbours):
+                code = code * 3 + classes[neighbour]
+            bits = self.table[offset + (squares[position] + 2) * NEIGHBOURHOODS + code]
+            safe = safe or bool(bits & 1)
+            mine = mine or bool(bits & 2)
+        return verdict(mine, safe)
+
+    def close(self):
+        """
+        Unmaps the table
+        """
+        self.table.close()
+
+
+_default_table = None
+
+
+def default_table() -> VerdictTable:
+    """
+    Returns the table used by the 'table' engine, loading it the first time
+    it is needed
+
+    @return the table loaded from DEFAULT_PATH
+    """
+    global _default_table  # pylint: disable=global-statement
+    if _default_table is None:
+        _default_table = VerdictTable()
+    return _default_table
+
+
+def main():
+    """
+    Builds the verdict table file from the command line
+    """
+    parser = ArgumentParser(description="Build the precomputed verdict table")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="enumerate the table and write it to a file")
+    build.add_argument('--output', default=DEFAULT_PATH, help="path of the table file")
+    args = parser.parse_args()
+
+    write_table(args.output)
+    print(f"Wrote {TABLE_SIZE} entries to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Reusable encoding template for 5x5 minesweeper states
+
+The middle square constraints (see state._build_truth_encodings) are the
+same for every board; only the x and y facts of the inner ring change. The
+template compiles those constraints once, either into an equivalent CNF
+without auxiliary variables or into a d-DNNF with dsharp (like
+lib204.Encoding.count_solutions), and solves each board by conditioning the
+compiled theory on the board's facts. This replaces building a new encoding
+and running kissat for every board
+"""
+
+from typing import Dict, List, Optional
+from nnf import And, Or, Var, config, dsharp
+from direct import INNER_RING, check_state, get_conditions, verdict
+from packed import PackedState
+
+
+def build_cnf() -> And:
+    """
+    Builds the middle square constraints as CNF clauses. Each iff of a
+    disjunction and a variable becomes one clause for the disjunction implying
+    the variable and one clause per disjunct for the other direction, so no
+    auxiliary variables are needed
+
+    @return the constraints as a CNF sentence
+    """
+    ring = [str(i) + str(j) for i, j in INNER_RING]
+    m, s, u = Var('m22'), Var('s22'), Var('u22')
+    clauses = []
+    for condition, middle in [('y', m), ('x', s)]:
+        # m22 <-> (y11 | ... | y33) and s22 <-> (x11 | ... | x33)
+        clauses.append(Or([~middle] + [Var(condition + num) for num in ring]))
+        clauses += [Or([~Var(condition + num), middle]) for num in ring]
+    # u22 <-> (~m22 & ~s22)
+    clauses += [Or([m, s, u]), Or([~u, ~m]), Or([~u, ~s])]
+    return And(clauses)
+
+
+class EncodingTemplate:
+    """
+    The middle square constraints compiled once and conditioned on each board
+    """
+
+    def __init__(self, backend: str = 'cnf', executable: str = 'bin/dsharp'):
+        """
+        @param backend: 'cnf' to condition the CNF clauses and solve them with
+                        nnf's native solver, or 'dsharp' to compile them into a
+                        d-DNNF first (conditioning it is linear in its size)
+        @param executable: path of the dsharp executable
+        """
+        if backend not in ['cnf', 'dsharp']:
+            raise Exception("error: backend must be one of cnf, dsharp")
+        self.backend = backend
+        self.theory = build_cnf()
+        if backend == 'dsharp':
+            self.theory = dsharp.compile(self.theory, executable=executable)
+
+    @staticmethod
+    def facts(state: List[List[int]]) -> Dict[str, bool]:
+        """
+        Returns the x and y facts of the inner ring of a board
+
+        @param state: a 5x5 minesweeper state
+        @return a dictionary from each variable name to its value
+        """
+        if isinstance(state, PackedState):
+            state = state.to_list()
+        check_state(state)
+        facts = {}
+        for i, j in INNER_RING:
+            num = str(i) + str(j)
+            facts['x' + num], facts['y' + num] = get_conditions(state, i, j)
+        return facts
+
+    def solve(self, state: List[List[int]]) -> Optional[Dict[str, bool]]:
+        """
+        Conditions the compiled theory on a board's facts and solves it
+
+        @param state: a 5x5 minesweeper state
+        @return a model with the facts and the middle square's m, s and u
+                conditions, or None if it is not satisfiable
+        """
+        facts = self.facts(state)
+        with config(sat_backend='native'):
+            model = self.theory.condition(facts).solve()
+        if model is None:
+            return None
+        model.update(facts)
+        return model
+
+    def classify(self, state: List[List[int]]) -> str:
+        """
+        Solves the middle square of a board
+
+        @param state: a 5x5 minesweeper state
+        @return the same result as MinesweeperState.get_solution for this state
+        """
+        model = self.solve(state)
+        if model is None:
+            return "error: model is not satisfiable"
+        return verdict(model['m22'], model['s22'])
+
+
+_default_template = None
+
+
+def default_template() -> EncodingTemplate:
+    """
+    Returns the template used by the 'template' engine, compiling it the
+    first time it is needed
+
+    @return the shared CNF template
+    """
+    global _default_template  # pylint: disable=global-statement
+    if _default_template is None:
+        _default_template = EncodingTemplate()
+    return _default_template
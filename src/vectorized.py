@@ -0,0 +1,187 @@
+"""
+Vectorized solver for batches of 5x5 minesweeper states (requires numpy)
+
+The x and y conditions of the inner 3x3 grid are computed for every board at
+once by summing the 8 shifted views of the mine and covered (mine or unknown)
+masks, giving the same solutions as the direct evaluator (see direct.py).
+validate_batch uses the same shifted views to check whole batches of boards
+before they are solved
+"""
+
+from typing import Iterable, List, Tuple
+import numpy as np
+from direct import ADJACENT
+from packed import PackedState
+
+# Solution for each verdict code (2 * mine + safe)
+VERDICTS = ("unknown", "safe", "mine", "schrodinger's mine")
+
+# Error bits set by validate_batch
+INVALID_VALUE = 1  # A square is not an integer in the range [-2, 8]
+TOO_FEW_COVERED = 2  # A number is larger than the neighbours that could be mines
+TOO_MANY_MINES = 4  # A number is smaller than its adjacent known mines
+ERRORS = {INVALID_VALUE: "a square is not an integer in the range [-2, 8]",
+          TOO_FEW_COVERED: "a number is larger than its neighbours that can be mines",
+          TOO_MANY_MINES: "a number is smaller than its adjacent known mines"}
+
+# Inner 3x3 grid squares that decide the middle square (all except the middle)
+_RING_MASK = np.ones((3, 3), dtype=bool)
+_RING_MASK[1, 1] = False
+
+
+def _check_squares(boards: np.ndarray):
+    """
+    Raises an exception if a square other than the middle one of a board has
+    an illegal value. The values are checked before the boards are converted
+    to int8, so a value like 254 cannot wrap around into a legal one
+
+    @param boards: an (N, 5, 5) array of minesweeper states
+    """
+    if not (np.issubdtype(boards.dtype, np.integer) or np.issubdtype(boards.dtype, np.floating)):
+        raise Exception("error: boards must be numeric")
+    illegal = ~((boards >= -2) & (boards <= 8))  # Also catches NaN
+    if np.issubdtype(boards.dtype, np.floating):
+        illegal |= boards != np.round(boards)
+    illegal[:, 2, 2] = False  # The middle square is never checked
+    if illegal.any():
+        n, i, j = np.argwhere(illegal)[0]
+        raise Exception('error: each square of the grid must'
+                        'have a value between -2 and 8'
+                        f'inclusive. Square [{i}][{j}] of board {n} has a'
+                        f'value of {boards[n, i, j]}')
+
+
+def _to_int8(boards: np.ndarray) -> np.ndarray:
+    """
+    Converts checked boards to int8. The middle square can have any value, so
+    values that are not -2 or -1 are replaced with 9 first: like in the direct
+    evaluator, they are revealed squares that never match a count
+
+    @param boards: an (N, 5, 5) array of minesweeper states that passed
+                   _check_squares
+    @return the boards as an int8 array
+    """
+    return np.where((boards >= -2) & (boards <= 8), boards, 9).astype(np.int8)
+
+
+def to_array(boards: Iterable[List[List[int]]]) -> np.ndarray:
+    """
+    Converts 5x5 boards into an (N, 5, 5) int8 array, raising an exception if
+    a square other than the middle one has an illegal value
+
+    @param boards: an iterable of 5x5 minesweeper states
+    @return the boards as a numpy array
+    """
+    array = np.array([board.to_list() if isinstance(board, PackedState) else board
+                      for board in boards])
+    if array.size == 0:
+        return array.astype(np.int8).reshape((0, 5, 5))
+    if array.ndim != 3 or array.shape[1:] != (5, 5):
+        raise Exception("error: boards must be 5x5 grids")
+    _check_squares(array)
+    return _to_int8(array)
+
+
+def conditions(boards: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Computes the x and y conditions of the inner 3x3 grid of each board
+
+    @param boards: an (N, 5, 5) int8 array of minesweeper states
+    @return a tuple of two (N, 3, 3) bool arrays with the x and y conditions
+    """
+    mines = (boards == -2).astype(np.int8)
+    covered = (boards < 0).astype(np.int8)  # Mines and unknown squares
+    mine_count = np.zeros((boards.shape[0], 3, 3), dtype=np.int8)
+    covered_count = np.zeros((boards.shape[0], 3, 3), dtype=np.int8)
+    for di, dj in ADJACENT:
+        mine_count += mines[:, 1 + di:4 + di, 1 + dj:4 + dj]
+        covered_count += covered[:, 1 + di:4 + di, 1 + dj:4 + dj]
+
+    inner = boards[:, 1:4, 1:4]
+    return inner == mine_count, inner == covered_count
+
+
+def classify_batch(boards: np.ndarray) -> np.ndarray:
+    """
+    Solves the middle square of every board, raising an exception if a square
+    other than the middle one has an illegal value
+
+    @param boards: an (N, 5, 5) integer array of minesweeper states
+    @return an (N,) int8 array of verdict codes (indices into VERDICTS)
+    """
+    boards = np.asarray(boards)
+    if boards.ndim != 3 or boards.shape[1:] != (5, 5):
+        raise Exception("error: boards must be an (N, 5, 5) array")
+    _check_squares(boards)  # Before the conversion, which could wrap values around
+    boards = _to_int8(boards)
+
+    x, y = conditions(boards)
+    safe = x[:, _RING_MASK].any(axis=1)
+    mine = y[:, _RING_MASK].any(axis=1)
+    return (mine.astype(np.int8) << 1) | safe.astype(np.int8)
+
+
+def validate_batch(boards) -> np.ndarray:
+    """
+    Checks every board of a batch without raising an exception for invalid
+    boards. Besides illegal values, a revealed number is invalid if it is
+    larger than the number of its neighbours that could be mines (known
+    mines, unknown squares and, for squares on the edge of the 5x5 grid, the
+    neighbours outside of it) or smaller than the number of its adjacent known
+    mines. Such a board matches no mine layout, so it can be rejected before
+    it reaches a solver
+
+    @param boards: an (N, 5, 5) array (or nested lists) of minesweeper states
+    @return an (N,) uint8 array with the error bits of each board (0 if it is
+            valid, see ERRORS)
+    """
+    boards = np.asarray(boards)
+    if boards.ndim != 3 or boards.shape[1:] != (5, 5):
+        raise Exception("error: boards must be an (N, 5, 5) array")
+    if not (np.issubdtype(boards.dtype, np.integer) or np.issubdtype(boards.dtype, np.floating)):
+        raise Exception("error: boards must be numeric")
+
+    invalid = ~((boards >= -2) & (boards <= 8))  # Also catches NaN
+    if np.issubdtype(boards.dtype, np.floating):
+        invalid |= boards != np.round(boards)
+    # Invalid squares are treated as unknown for the other checks
+    squares = np.where(invalid, -1, boards).astype(np.int8)
+
+    # Squares outside of the grid (-3) could be mines, like unknown squares
+    padded = np.pad(squares, ((0, 0), (1, 1), (1, 1)), constant_values=-3)
+    mines = (padded == -2).astype(np.int8)
+    possible = (padded < 0).astype(np.int8)
+    mine_count = np.zeros(squares.shape, dtype=np.int8)
+    possible_count = np.zeros(squares.shape, dtype=np.int8)
+    for di, dj in ADJACENT:
+        mine_count += mines[:, 1 + di:6 + di, 1 + dj:6 + dj]
+        possible_count += possible[:, 1 + di:6 + di, 1 + dj:6 + dj]
+
+    revealed = squares >= 0
+    errors = invalid.any(axis=(1, 2)).astype(np.uint8) * INVALID_VALUE
+    errors |= (revealed & (squares > possible_count)).any(axis=(1, 2)).astype(np.uint8) * TOO_FEW_COVERED
+    errors |= (revealed & (squares < mine_count)).any(axis=(1, 2)).astype(np.uint8) * TOO_MANY_MINES
+    return errors
+
+
+def error_message(errors: int) -> str:
+    """
+    Returns the message for the error bits of a board
+
+    @param errors: error bits from validate_batch
+    @return the messages of every set bit, or an empty string if there are none
+    """
+    messages = [message for bit, message in ERRORS.items() if errors & bit]
+    return "error: " + "; ".join(messages) if messages else ""
+
+
+def solve_batch(boards: Iterable[List[List[int]]]) -> List[str]:
+    """
+    Solves a collection of 5x5 boards
+
+    @param boards: an iterable of 5x5 minesweeper states or an (N, 5, 5) array
+    @return a list with the solution of each board, in the same order
+    """
+    if not isinstance(boards, np.ndarray):
+        boards = to_array(boards)
+    return [VERDICTS[code] for code in classify_batch(boards)]
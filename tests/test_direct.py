@@ -0,0 +1,47 @@
+"""
+Checks that the direct evaluator gives the same results as the SAT engine
+"""
+
+import pytest
+from benchmark import random_boards
+import direct
+from predefined_states import state_list
+from state import MinesweeperState
+
+pytest.importorskip('nnf')  # The SAT engine is the reference
+
+BOARDS = [predefined['state'] for predefined in state_list.values()] + random_boards(1000)
+
+
+@pytest.mark.parametrize('board', BOARDS)
+def test_classify_matches_sat(board):
+    """
+    The direct verdict is the SAT engine's verdict
+    """
+    assert direct.classify(board) == MinesweeperState(board).solve()
+
+
+@pytest.mark.parametrize('board', BOARDS[:200])
+def test_evaluate_matches_sat_model(board):
+    """
+    The direct model has the SAT model's value for every variable of the
+    inner 3x3 grid
+    """
+    state = MinesweeperState(board)
+    state.solve()
+    model = direct.evaluate(board)
+    for i in range(1, 4):
+        for j in range(1, 4):
+            for prefix in 'msu' if (i, j) == (2, 2) else 'xymsu':
+                name = prefix + str(i) + str(j)
+                assert model[name] == state.solution[name], name
+
+
+def test_illegal_square():
+    """
+    Squares outside of [-2, 8] are rejected like in the SAT engine
+    """
+    board = [row[:] for row in BOARDS[0]]
+    board[0][0] = 9
+    with pytest.raises(Exception, match='error'):
+        direct.classify(board)
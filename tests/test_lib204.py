@@ -0,0 +1,100 @@
+"""
+Checks the sequential counter cardinality constraints of lib204.Encoding
+"""
+
+from itertools import product
+import pytest
+
+nnf = pytest.importorskip('nnf')
+from lib204 import Encoding  # noqa: E402  pylint: disable=wrong-import-position
+
+
+@pytest.mark.parametrize('n', range(6))
+def test_cardinality_has_one_extension_per_solution(n):
+    """
+    Every assignment of the variables that meets the bounds has exactly one
+    extension to the auxiliary variables and every other assignment has
+    none, so model counts are not changed by the counter
+    """
+    names = [f"x{i}" for i in range(n)]
+    variables = [nnf.Var(name) for name in names]
+    for at_least, at_most in product(range(-1, n + 2), repeat=2):
+        sentence = Encoding().cardinality(variables, at_least, at_most)
+        for values in product([False, True], repeat=n):
+            extensions = len(list(sentence.condition(dict(zip(names, values))).models()))
+            assert extensions == (1 if at_least <= sum(values) <= at_most else 0), \
+                (values, at_least, at_most)
+
+
+def test_add_helpers():
+    """
+    add_exactly, add_at_most and add_at_least constrain the encoding
+    """
+    variables = [nnf.Var(f"x{i}") for i in range(4)]
+    for k in range(5):
+        for add, allowed in [(Encoding.add_exactly, lambda count, k=k: count == k),
+                             (Encoding.add_at_most, lambda count, k=k: count <= k),
+                             (Encoding.add_at_least, lambda count, k=k: count >= k)]:
+            encoding = Encoding()
+            add(encoding, variables, k)
+            for values in product([False, True], repeat=4):
+                assignment = {f"x{i}": value for i, value in enumerate(values)}
+                assert encoding.theory().condition(assignment).satisfiable() == allowed(sum(values))
+
+
+def test_one_backend_call_per_solve():
+    """
+    is_satisfiable and a second solve reuse the model of the first solve
+    """
+    x, y = nnf.Var('x'), nnf.Var('y')
+    encoding = Encoding()
+    encoding.add_constraint(x | y)
+    encoding.add_constraint(~x)
+    model = encoding.solve()
+    assert encoding.is_satisfiable()
+    assert encoding.solve() == model == {'x': False, 'y': True}
+    assert encoding.backend_calls['sat'] == 1
+
+
+@pytest.mark.parametrize('change', ['add', 'replace'])
+def test_changing_constraints_clears_the_cache(change):
+    """
+    Adding or replacing a constraint invalidates every derived result
+    """
+    x, y, z = nnf.Var('x'), nnf.Var('y'), nnf.Var('z')
+    encoding = Encoding()
+    encoding.add_constraint(x)
+    encoding.add_constraint(~y)
+    assert encoding.solve() == {'x': True, 'y': False}
+    before = (encoding.theory(), encoding.cnf())
+
+    if change == 'add':
+        encoding.add_constraint(z | y)
+    else:
+        encoding.replace_constraint(1, z | y)
+    assert not encoding.cache
+    assert encoding.theory() != before[0]
+    assert encoding.cnf() != before[1]
+    assert encoding.vars() == {'x', 'y', 'z'}
+    assert encoding.size() == sum(c.size() for c in encoding.constraints)
+    model = encoding.solve()
+    assert model['x'] and (model['z'] or model['y'])
+    if change == 'add':
+        assert not model['y']
+    assert encoding.backend_calls['sat'] == 2
+
+
+def test_unsatisfiable_encoding_runs_the_backend_once():
+    """
+    Once an encoding is known to be unsatisfiable, is_satisfiable and solve
+    answer without the backend
+    """
+    x = nnf.Var('x')
+    encoding = Encoding()
+    encoding.add_constraint(x)
+    encoding.add_constraint(~x)
+    assert not encoding.is_satisfiable()
+    assert encoding.solve() is None
+    assert not encoding.is_satisfiable()
+    assert encoding.solve() is None
+    assert encoding.backend_calls['sat'] == 1
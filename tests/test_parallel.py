@@ -0,0 +1,92 @@
+"""
+Checks that the parallel solver keeps the input order and only fails the
+boards that kill a worker process
+"""
+
+import os
+import time
+from benchmark import random_boards
+import parallel
+from persistent_cache import PersistentCache
+from state import solve_many
+
+# Boards with one of these values in their top left square kill the worker
+# that solves them or make it slow
+CRASH = 7
+SLOW = 6
+
+
+def _faulty_chunk(chunk, engine, cache_path=None):  # pylint: disable=unused-argument
+    """
+    Solves a chunk like parallel._solve_chunk, except for the crashing and
+    slow boards
+    """
+    for board in chunk:
+        if board[0][0] == CRASH:
+            os._exit(1)  # pylint: disable=protected-access
+        if board[0][0] == SLOW:
+            time.sleep(0.2)
+    return solve_many(chunk, engine)
+
+
+def _boards(count):
+    """
+    Random boards without the crashing and slow values
+    """
+    boards = random_boards(count)
+    for board in boards:
+        board[0][0] = -1
+    return boards
+
+
+def test_same_order_as_solve_many():
+    """
+    The solutions are the same as solving the boards in order
+    """
+    boards = random_boards(500)
+    assert list(parallel.solve_parallel(boards, 2, 'direct', chunksize=16)) == \
+        solve_many(boards, 'direct')
+
+
+def test_only_the_crashing_board_fails(monkeypatch):
+    """
+    A board that kills its worker gets an error message, and so does nothing
+    else, including a slow chunk that was running when the pool broke
+    """
+    monkeypatch.setattr(parallel, '_solve_chunk', _faulty_chunk)  # Inherited by forked workers
+    boards = _boards(200)
+    boards[20][0][0] = SLOW
+    boards[45][0][0] = CRASH
+    results = list(parallel.solve_parallel(boards, 2, 'direct', chunksize=10))
+    expected = solve_many(boards, 'direct')
+    expected[45] = "error: worker process died"
+    assert results == expected
+
+
+def test_workers_share_the_cache(tmp_path):
+    """
+    Every worker stores its solutions in the same persistent cache
+    """
+    path = str(tmp_path / 'verdicts.sqlite')
+    boards = random_boards(300)
+    assert list(parallel.solve_parallel(boards, 3, 'direct', chunksize=16, cache_path=path)) == \
+        solve_many(boards, 'direct')
+    cache = PersistentCache(path)
+    assert cache.size() > 0
+    assert [cache.get(board) for board in boards] == solve_many(boards, 'direct')
+    assert cache.misses == 0
+
+
+def test_every_error_has_the_prefix():
+    """
+    Boards that raise an exception get a message starting with "error:", even
+    when the exception does not come from the solver's own checks
+    """
+    boards = _boards(40)
+    boards[5][1][1] = 'a'  # Raises a TypeError
+    boards[30][1][1] = 9  # Raises the solver's own error
+    results = list(parallel.solve_parallel(boards, 2, 'direct', chunksize=8))
+    assert results[5].startswith("error: ") and 'str' in results[5]
+    assert results[30].startswith("error: ") and not results[30].startswith("error: error")
+    expected = solve_many(boards[:5] + boards[6:30] + boards[31:], 'direct')
+    assert results[:5] + results[6:30] + results[31:] == expected
@@ -0,0 +1,42 @@
+"""
+Checks the propagation engine against the SAT engine and against the mine
+probabilities of probability.py
+"""
+
+import pytest
+from benchmark import benchmark_boards
+import generator
+from probability import mine_probabilities
+import propagation
+from state import MinesweeperState
+
+WINDOWS = list(generator.windows(300, packed=False))
+
+
+@pytest.mark.parametrize('board', benchmark_boards(300))
+def test_classify_agrees_with_sat(board):
+    """
+    Wherever both engines find the middle square is a mine or is safe, they
+    agree (random boards can contradict themselves, which the engines report
+    differently)
+    """
+    pytest.importorskip('nnf')
+    solution = propagation.classify(board)
+    expected = MinesweeperState(board).solve()
+    if solution in ['mine', 'safe'] and expected in ['mine', 'safe']:
+        assert solution == expected
+
+
+@pytest.mark.parametrize('window', WINDOWS)
+def test_classify_all_matches_probabilities(window):
+    """
+    A square is a mine when every layout has a mine in it, safe when none
+    does, and unknown otherwise
+    """
+    squares = [(i, j) for i in range(1, 4) for j in range(1, 4) if window[i][j] == -1]
+    solutions = propagation.classify_all(window, squares)
+    probabilities = mine_probabilities(window, window=True)
+    for square in squares:
+        probability = probabilities[square]
+        expected = 'mine' if probability == 1 else 'safe' if probability == 0 else 'unknown'
+        assert solutions[square] == expected, square
@@ -0,0 +1,108 @@
+"""
+Checks the solving service over a TCP connection on localhost
+"""
+
+import asyncio
+import json
+from benchmark import random_boards
+from service import SolveService
+from state import solve_many
+
+BOARDS = random_boards(300)
+
+
+async def _exchange(service: SolveService, requests: list, watch=None) -> dict:
+    """
+    Starts a service on a free port, sends every request on one connection and
+    reads one response per request
+
+    @param service: the service to start (stopped when done)
+    @param requests: the requests, each with a unique 'id'
+    @param watch: a function called on every event loop iteration while the
+                  requests are answered, or None
+    @return a dictionary from each id to its response
+    """
+    server = await service.start(port=0)
+    reader, writer = await asyncio.open_connection('127.0.0.1', server.sockets[0].getsockname()[1])
+
+    async def send():
+        for request in requests:
+            writer.write(json.dumps(request).encode() + b'\n')
+            await writer.drain()
+
+    async def spin():
+        while True:
+            watch()
+            await asyncio.sleep(0)
+
+    tasks = [asyncio.create_task(send())] + ([asyncio.create_task(spin())] if watch else [])
+    responses = {}
+    try:
+        while len(responses) < len(requests):
+            response = json.loads(await reader.readline())
+            responses[response['id']] = response
+    finally:
+        for task in tasks:
+            task.cancel()
+        writer.close()
+        await service.stop()
+    return responses
+
+
+def test_round_trip_matches_solve_many():
+    """
+    Every board is answered with the solution solve_many gives it
+    """
+    requests = [{'id': n, 'state': board} for n, board in enumerate(BOARDS)]
+    responses = asyncio.run(_exchange(SolveService('direct', batch_size=16), requests))
+    expected = solve_many(BOARDS, 'direct')
+    assert [responses[n].get('solution') for n in range(len(BOARDS))] == expected
+
+
+def test_invalid_requests_get_errors():
+    """
+    Invalid boards and requests are answered with an error instead of a solution
+    """
+    board = [row[:] for row in BOARDS[0]]
+    board[0][0] = 9
+    requests = [{'id': 0, 'state': board}, {'id': 1, 'state': [[0] * 5] * 4},
+                {'id': 2}, {'id': 3, 'state': BOARDS[0]}]
+    responses = asyncio.run(_exchange(SolveService('direct'), requests))
+    for n in range(3):
+        assert 'solution' not in responses[n]
+        assert responses[n]['error'].startswith('error')
+    assert responses[3] == {'id': 3, 'solution': solve_many([BOARDS[0]], 'direct')[0]}
+
+
+def test_metrics():
+    """
+    A metrics request reports the boards solved before it was sent
+    """
+    service = SolveService('direct')
+    requests = [{'id': n, 'state': board} for n, board in enumerate(BOARDS[:50])]
+    asyncio.run(_exchange(service, requests))
+    responses = asyncio.run(_exchange(service, [{'id': 'm', 'metrics': True, 'reset': True}]))
+    metrics = responses['m']['metrics']
+    assert metrics['solved'] == 50 and metrics['queue_depth'] == 0
+    assert metrics['batches'] >= 1 and metrics['latency']['p50_us'] > 0
+    assert not service.latencies and not service.batch_sizes  # Reset
+
+
+def test_requests_in_flight_are_bounded():
+    """
+    With a small max_queue, the service stops reading a connection instead of
+    starting a task for every request that was sent
+    """
+    peak = 0
+
+    def watch():
+        nonlocal peak
+        handlers = [task for task in asyncio.all_tasks()
+                    if 'handle_request' in task.get_coro().__qualname__]
+        peak = max(peak, len(handlers))
+
+    requests = [{'id': n, 'state': BOARDS[n % len(BOARDS)]} for n in range(2000)]
+    responses = asyncio.run(_exchange(SolveService('direct', batch_size=2, max_queue=4),
+                                      requests, watch))
+    assert len(responses) == 2000
+    assert 0 < peak <= 4
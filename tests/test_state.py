@@ -0,0 +1,46 @@
+"""
+Checks MinesweeperState modes against freshly built states
+"""
+
+from random import Random
+import pytest
+from benchmark import random_boards
+import generator
+from state import MinesweeperState
+
+pytest.importorskip('nnf')
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_incremental_edits_match_fresh_states(seed):
+    """
+    Patching the encoding of an incremental state after random square and
+    row edits gives the verdict of a state built from scratch, without adding
+    constraints
+    """
+    rng = Random(seed)
+    state = MinesweeperState(random_boards(1, seed=seed)[0], incremental=True)
+    state.solve()
+    size = len(state.E.constraints)
+    assert size == 93
+    for _ in range(15):
+        i = rng.randrange(5)
+        if rng.random() < 0.7:
+            state.set_square(i, rng.randrange(5), rng.randint(-2, 8))
+        else:
+            state.set_row(i, [rng.randint(-2, 8) for _ in range(5)])
+        assert state.solve() == MinesweeperState(state.state).solve()
+        assert len(state.E.constraints) == size
+
+
+@pytest.mark.parametrize('window', list(generator.windows(100, packed=False)))
+def test_solve_all(window):
+    """
+    solve_all gives the middle square the verdict of solve, and the sat and
+    direct engines agree on every square
+    """
+    sat = MinesweeperState(window).solve_all()
+    assert sat[(2, 2)] == MinesweeperState(window).solve()
+    assert MinesweeperState(window, engine='direct').solve_all() == sat
+    assert set(sat) == {(i, j) for i in range(1, 4) for j in range(1, 4)
+                        if (i, j) == (2, 2) or window[i][j] == -1}
@@ -0,0 +1,92 @@
+"""
+Checks the vectorized solver against the direct evaluator
+"""
+
+import pytest
+from benchmark import random_boards
+import direct
+from predefined_states import state_list
+
+np = pytest.importorskip('numpy')
+import vectorized  # noqa: E402  pylint: disable=wrong-import-position
+
+BOARDS = [predefined['state'] for predefined in state_list.values()] + random_boards(2000)
+
+
+def test_solve_batch_matches_direct():
+    """
+    Every verdict is the direct evaluator's verdict, for lists and arrays
+    """
+    expected = [direct.classify(board) for board in BOARDS]
+    assert vectorized.solve_batch(BOARDS) == expected
+    assert vectorized.solve_batch(np.array(BOARDS, dtype=np.int64)) == expected
+
+
+def test_middle_square_can_have_any_value():
+    """
+    Like in the direct evaluator, the middle square is never checked and only
+    counts as covered if it is -2 or -1
+    """
+    boards = [[row[:] for row in board] for board in BOARDS[:200]]
+    for board, middle in zip(boards, [254, 300, -5, 3] * 50):
+        board[2][2] = middle
+    assert vectorized.solve_batch(boards) == [direct.classify(board) for board in boards]
+    assert vectorized.solve_batch(np.array(boards)) == [direct.classify(board) for board in boards]
+
+
+@pytest.mark.parametrize('value', [9, -3, 254, 300, -129])
+def test_illegal_square(value):
+    """
+    Out of range squares raise an exception instead of wrapping around in int8
+    """
+    board = [row[:] for row in BOARDS[0]]
+    board[1][1] = value
+    with pytest.raises(Exception, match='error'):
+        vectorized.classify_batch(np.array([board], dtype=np.int64))
+    with pytest.raises(Exception, match='error'):
+        vectorized.solve_batch([board])
+
+
+def _reference_errors(board) -> int:
+    """
+    Computes validate_batch's error bits for one board one square at a time
+    """
+    def legal(value):
+        return isinstance(value, int) and -2 <= value <= 8
+
+    errors = 0
+    for i in range(5):
+        for j in range(5):
+            if not legal(board[i][j]):
+                errors |= vectorized.INVALID_VALUE
+                continue
+            if board[i][j] < 0:
+                continue
+            mines = possible = 0
+            for di, dj in direct.ADJACENT:
+                if not (0 <= i + di < 5 and 0 <= j + dj < 5):
+                    possible += 1  # Outside of the grid, could be a mine
+                    continue
+                neighbour = board[i + di][j + dj]
+                neighbour = neighbour if legal(neighbour) else -1
+                mines += neighbour == -2
+                possible += neighbour < 0
+            if board[i][j] > possible:
+                errors |= vectorized.TOO_FEW_COVERED
+            if board[i][j] < mines:
+                errors |= vectorized.TOO_MANY_MINES
+    return errors
+
+
+def test_validate_batch_matches_reference():
+    """
+    The error bits of every board are the ones found by checking each square
+    on its own, including boards with illegal values
+    """
+    boards = [[row[:] for row in board] for board in BOARDS]
+    for n, value in enumerate([9, -3, 254, -129] * 50):
+        boards[n * 10][n % 5][n // 5 % 5] = value
+    expected = [_reference_errors(board) for board in boards]
+    assert vectorized.validate_batch(boards).tolist() == expected
+    assert vectorized.validate_batch(np.array(boards, dtype=np.int64)).tolist() == expected
+    assert any(expected) and not all(expected)